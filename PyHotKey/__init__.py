@@ -19,7 +19,20 @@
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
                 A cross-platform keyboard module for Python.
 """
-from ._keys import Key
-from ._keyboard import keyboard
+__all__ = ['Key', 'KeyEvent', 'KeyJournal', 'Modifier', 'keyboard']
 
-__all__ = ['Key', 'keyboard']
+
+def __getattr__(name):
+    # Importing the package doesn't load a backend, nor create the keyboard
+    if name in ('Key', 'KeyEvent', 'Modifier'):
+        from . import _keys
+        value = getattr(_keys, name)
+    elif 'keyboard' == name:
+        from ._keyboard import get_keyboard
+        value = get_keyboard()
+    elif 'KeyJournal' == name:
+        from ._journal import KeyJournal as value
+    else:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    globals()[name] = value
+    return value
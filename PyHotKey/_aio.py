@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+asyncio support.
+"""
+from sys import modules
+from collections import deque
+
+
+def running_loop():
+    """Return the running event loop, or None."""
+    # No event loop can run before asyncio is imported, don't import it for nothing
+    if 'asyncio' not in modules:
+        return None
+    from asyncio import get_running_loop
+    try:
+        return get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class KeyEventStream:
+    """
+    A bounded buffer of key events, filled by the keyboard listener and read
+    by a coroutine. When the buffer is full, the oldest event is dropped.
+    """
+
+    def __init__(self, loop, maxsize):
+        self.__loop = loop
+        self.__events = deque(maxlen=maxsize)
+        self.__waiter = None
+        self.dropped = 0
+
+    def put(self, event):
+        """Add an event, called in the listener thread."""
+        events = self.__events
+        if len(events) == events.maxlen:
+            self.dropped += 1
+        events.append(event)
+        waiter = self.__waiter
+        if None is not waiter:
+            self.__waiter = None
+            try:
+                self.__loop.call_soon_threadsafe(self.__wake_up, waiter)
+            except RuntimeError:
+                # The event loop is closed, nobody reads the events anymore
+                pass
+
+    @staticmethod
+    def __wake_up(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def get(self):
+        """Wait for an event and return it."""
+        while not self.__events:
+            waiter = self.__waiter = self.__loop.create_future()
+            if self.__events:
+                self.__waiter = None
+                break
+            try:
+                await waiter
+            finally:
+                self.__waiter = None
+        return self.__events.popleft()
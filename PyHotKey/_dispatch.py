@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Callback dispatcher.
+"""
+from queue import Queue, Full
+from time import perf_counter
+from threading import Thread, Lock
+
+
+class Dispatcher:
+    """
+    Run functions on a pool of worker threads.
+
+    Pending functions are kept in a bounded queue, when the queue is full,
+    a new function is dropped ("drop" policy) or the caller waits ("block"
+    policy). An exception raised by a function is counted in "errors", the
+    worker keeps running.
+    """
+    POLICIES = ('drop', 'block')
+
+    def __init__(self, workers, queue_size, policy='drop'):
+        """
+        :param workers: number of worker threads.
+        :param queue_size: max number of pending functions.
+        :param policy: "drop" or "block".
+        """
+        self.__queue = Queue(queue_size)
+        self.__block = 'block' == policy
+        self.__lock = Lock()
+        self.__workers = workers
+        self.__submitted = 0
+        self.__dropped = 0
+        self.__completed = 0
+        self.__errors = 0
+        self.__max_depth = 0
+        self.__latency_total = 0.0
+        self.__latency_max = 0.0
+        for i in range(workers):
+            Thread(target=self.__work, name='PyHotKey-dispatcher-{}'.format(i), daemon=True).start()
+
+    def __work(self):
+        while True:
+            task = self.__queue.get()
+            if None is task:
+                break
+            submitted_at, func, args = task
+            latency = perf_counter() - submitted_at
+            error = False
+            try:
+                func(*args)
+            except Exception:
+                error = True
+            finally:
+                with self.__lock:
+                    self.__completed += 1
+                    self.__errors += error
+                    self.__latency_total += latency
+                    if latency > self.__latency_max:
+                        self.__latency_max = latency
+
+    def submit(self, func, *args):
+        """
+        Queue a function.
+        :rtype: bool, False if the function is dropped.
+        """
+        try:
+            self.__queue.put((perf_counter(), func, args), self.__block)
+        except Full:
+            self.__dropped += 1
+            return False
+        self.__submitted += 1
+        depth = self.__queue.qsize()
+        if depth > self.__max_depth:
+            self.__max_depth = depth
+        return True
+
+    def stop(self):
+        """Stop the workers after the pending functions are done."""
+        for _ in range(self.__workers):
+            self.__queue.put(None)
+
+    @property
+    def stats(self):
+        with self.__lock:
+            completed = self.__completed
+            errors = self.__errors
+            latency_total = self.__latency_total
+            latency_max = self.__latency_max
+        return {'workers': self.__workers,
+                'queue_size': self.__queue.maxsize,
+                'queue_depth': self.__queue.qsize(),
+                'max_queue_depth': self.__max_depth,
+                'submitted': self.__submitted,
+                'dropped': self.__dropped,
+                'completed': completed,
+                'errors': errors,
+                'latency_avg': latency_total / completed if completed else 0.0,
+                'latency_max': latency_max}
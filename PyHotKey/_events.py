@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Key event queues for threads.
+"""
+from time import monotonic
+from threading import Event, Lock
+from collections import deque
+from ._keys import KeyEvent, get_cold_key
+
+
+class KeyEventQueue:
+    """
+    A bounded buffer of key events, filled by the keyboard listener and read
+    by other threads.
+
+    The listener thread only appends a (key id, timestamp, pressed, suppressed)
+    tuple and never takes a lock, the records are turned into KeyEvent when
+    they are read. When the buffer is full, the oldest event ("drop_oldest"
+    policy) or the new event ("drop_newest" policy) is dropped and counted in
+    "dropped".
+    """
+    POLICIES = ('drop_oldest', 'drop_newest')
+
+    def __init__(self, maxsize, policy='drop_oldest', on_close=None):
+        """
+        :param maxsize: max number of buffered events.
+        :param policy: "drop_oldest" or "drop_newest".
+        :param on_close: function called by "close".
+        """
+        self.__maxsize = maxsize
+        self.__drop_newest = 'drop_newest' == policy
+        self.__events = deque(maxlen=maxsize)
+        self.__on_close = on_close
+        # Set by the listener when a reader is waiting
+        self.__ready = Event()
+        self.__waiters = 0
+        self.__waiters_lock = Lock()
+        self.__closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.__events)
+
+    def __bool__(self):
+        # An empty queue is still a queue, eg: "subscribe" returns None on failure
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def maxsize(self):
+        return self.__maxsize
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def put(self, kid, timestamp, pressed, suppressed):
+        """Add an event, called in the listener thread."""
+        events = self.__events
+        if len(events) == self.__maxsize:
+            self.dropped += 1
+            if self.__drop_newest:
+                return
+        events.append((kid, timestamp, pressed, suppressed))
+        if self.__waiters and not self.__ready.is_set():
+            self.__ready.set()
+
+    def __wait(self, timeout):
+        """Wait until there is an event, return False on timeout or if the queue is closed."""
+        if self.__events:
+            return True
+        if self.__closed or (None is not timeout and 0 >= timeout):
+            return False
+        deadline = None if None is timeout else monotonic() + timeout
+        with self.__waiters_lock:
+            self.__waiters += 1
+        try:
+            while True:
+                self.__ready.clear()
+                if self.__events:
+                    return True
+                if self.__closed:
+                    return False
+                remaining = None if None is deadline else deadline - monotonic()
+                if None is not remaining and 0 >= remaining:
+                    return False
+                self.__ready.wait(remaining)
+        finally:
+            with self.__waiters_lock:
+                self.__waiters -= 1
+
+    def __pop(self, max_n):
+        records = []
+        events = self.__events
+        try:
+            while len(records) < max_n:
+                records.append(events.popleft())
+        except IndexError:
+            # Another reader took the last events
+            pass
+        if events:
+            # Wake up the other readers, "clear" may have hidden the remaining events from them
+            self.__ready.set()
+        return [KeyEvent(get_cold_key(kid), pressed, timestamp, suppressed)
+                for kid, timestamp, pressed, suppressed in records]
+
+    def get(self, timeout=None):
+        """
+        Wait for an event and return it.
+        :param timeout: max seconds to wait, None means no limit, 0 means no wait.
+        :return: a KeyEvent, or None on timeout or if the queue is closed and empty.
+        """
+        while self.__wait(timeout):
+            events = self.__pop(1)
+            if events:
+                return events[0]
+        return None
+
+    def drain(self, max_n=None, timeout=0):
+        """
+        Return the buffered events, oldest first.
+        :param max_n: max number of events, None means all.
+        :param timeout: max seconds to wait for the first event, None means no limit, 0 means no wait.
+        :return: a KeyEvent list, empty on timeout.
+        """
+        if not self.__wait(timeout):
+            return []
+        return self.__pop(len(self.__events) if None is max_n else max_n)
+
+    def close(self):
+        """Stop receiving events and wake up the waiting readers, the buffered events can still be read."""
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__ready.set()
+        if self.__on_close:
+            self.__on_close(self)
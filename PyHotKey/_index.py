@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Hotkey index.
+"""
+
+
+# A key count has SHARD_MASK + 1 shards
+SHARD_MASK = 255
+
+
+class HotKeyIndex:
+    """
+    Store the tables used to match the registered hotkeys.
+
+    Hotkeys with multiple keys are indexed by their key count, the hash of
+    their key id set (a shard), then by their key id set: the smallest key id
+    would put most hotkeys in the shard of a modifier. Hotkeys with single key are
+    indexed by their key id, then by their count. So a hotkey can be matched
+    without scanning all the hotkeys.
+
+    An index is immutable: "with_hotkey(s)" and "without_hotkey(s)" return a
+    new index, so the listener thread can match hotkeys in an index without any
+    lock while another thread builds the next one. Only the shards touched by
+    the changed hotkeys are copied, with the dict holding them.
+    """
+
+    def __init__(self):
+        # Key count -> {hash of the key id set & SHARD_MASK: {key id set: hotkey}}
+        self.__combinations = {}
+        # Key id -> {count: hotkey}
+        self.__taps = {}
+
+    def find(self, hotkey):
+        """Return the registered hotkey which equals "hotkey", or None."""
+        if 1 < len(hotkey.keys):
+            length, shard = self.__shard(hotkey)
+            return self.__combinations.get(length, {}).get(shard, {}).get(hotkey.key_set)
+        return self.__taps.get(hotkey.keys[0].id, {}).get(hotkey.count)
+
+    @staticmethod
+    def __shard(hotkey):
+        return len(hotkey.key_set), hash(hotkey.key_set) & SHARD_MASK
+
+    def __copy(self):
+        index = HotKeyIndex.__new__(HotKeyIndex)
+        index.__combinations = self.__combinations
+        index.__taps = self.__taps
+        return index
+
+    def with_hotkey(self, hotkey):
+        """Return a new index with "hotkey" added, only the shard of "hotkey" is copied."""
+        return self.with_hotkeys((hotkey,))
+
+    def without_hotkey(self, hotkey):
+        """Return a new index with "hotkey" removed, only the shard of "hotkey" is copied."""
+        return self.without_hotkeys((hotkey,))
+
+    def with_hotkeys(self, hotkeys):
+        """Return a new index with "hotkeys" added, each touched shard is copied once."""
+        index = self.__copy()
+        if not hotkeys:
+            return index
+        combinations, taps = index.__shards(hotkeys)
+        for hotkey in hotkeys:
+            if 1 < len(hotkey.keys):
+                length, shard = self.__shard(hotkey)
+                combinations[length][shard][hotkey.key_set] = hotkey
+            else:
+                taps[hotkey.keys[0].id][hotkey.count] = hotkey
+        return index
+
+    def without_hotkeys(self, hotkeys):
+        """Return a new index with "hotkeys" removed, each touched shard is copied once."""
+        index = self.__copy()
+        if not hotkeys:
+            return index
+        combinations, taps = index.__shards(hotkeys)
+        for hotkey in hotkeys:
+            if 1 < len(hotkey.keys):
+                length, shard = self.__shard(hotkey)
+                shards = combinations[length]
+                bucket = shards[shard]
+                bucket.pop(hotkey.key_set)
+                if not bucket:
+                    shards.pop(shard)
+                    if not shards:
+                        combinations.pop(length)
+            else:
+                kid = hotkey.keys[0].id
+                counts = taps[kid]
+                counts.pop(hotkey.count)
+                if not counts:
+                    taps.pop(kid)
+        return index
+
+    def __shards(self, hotkeys):
+        """Replace the shards touched by "hotkeys" (and the dicts holding them) with copies, return the dicts."""
+        shards = {self.__shard(h) for h in hotkeys if 1 < len(h.keys)}
+        tap_keys = {h.keys[0].id for h in hotkeys if 1 == len(h.keys)}
+        if shards:
+            combinations = self.__combinations = self.__combinations.copy()
+            for length in {length for length, _ in shards}:
+                combinations[length] = dict(combinations.get(length, ()))
+            for length, shard in shards:
+                combinations[length][shard] = dict(combinations[length].get(shard, ()))
+        if tap_keys:
+            self.__taps = self.__taps.copy()
+            for kid in tap_keys:
+                self.__taps[kid] = dict(self.__taps.get(kid, ()))
+        return self.__combinations, self.__taps
+
+    def match_combination(self, key_ids):
+        """
+        Return the hotkey whose keys are exactly "key_ids", or None.
+        :param key_ids: ids of the pressed keys.
+        """
+        shards = self.__combinations.get(len(key_ids))
+        if not shards:
+            return None
+        key_set = frozenset(key_ids)
+        # The hash of a frozenset is cached, the last lookup doesn't compute it again
+        combinations = shards.get(hash(key_set) & SHARD_MASK)
+        return combinations.get(key_set) if combinations else None
+
+    def has_taps(self, kid):
+        """Whether there is any hotkey with the single key "kid"."""
+        return kid in self.__taps
+
+    def match_tap(self, kid, count):
+        """
+        Return the hotkey with single key "kid" which is tapped "count" times, or None.
+        :param kid: id of the released key.
+        :param count: the number of taps.
+        """
+        counts = self.__taps.get(kid)
+        return counts.get(count) if counts else None
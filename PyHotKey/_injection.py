@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Key injection jobs.
+"""
+from time import perf_counter_ns
+from threading import Thread, Event, Lock
+from collections import OrderedDict
+from ._keys import to_key
+
+# Sleep until this many nanoseconds before the target time, then spin
+SPIN_NS = 2000000
+
+
+class InjectionJob:
+    """Inject key events on a dedicated thread, use "wait" or "cancel" to control it."""
+
+    def __init__(self, controller, name):
+        self._controller = controller
+        self._cancelled = Event()
+        self.__done = Event()
+        self.error = None
+        self.__thread = Thread(target=self.__run, name=name, daemon=True)
+
+    def start(self):
+        """Run the job on its thread."""
+        self.__thread.start()
+        return self
+
+    def run(self):
+        """Run the job in the current thread, exceptions are raised."""
+        self.__run()
+        if self.error:
+            raise self.error
+
+    def __run(self):
+        try:
+            self._run()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.__done.set()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _sleep_until(self, target):
+        """
+        Wait until perf_counter_ns() reaches "target".
+        :return: False if the job is cancelled.
+        """
+        remaining = target - perf_counter_ns()
+        if remaining > SPIN_NS and self._cancelled.wait((remaining - SPIN_NS) / 1e9):
+            return False
+        while perf_counter_ns() < target:
+            pass
+        return not self._cancelled.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the job is finished or cancelled.
+        :rtype: bool, False if the job is still running after "timeout" seconds.
+        """
+        return self.__done.wait(timeout)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def done(self):
+        return self.__done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class Replay(InjectionJob):
+    """
+    Replay recorded key events with their original timing.
+
+    Events closer than "batch_window" seconds are injected together, the
+    scheduling error of every batch is recorded, see "jitter".
+    """
+
+    def __init__(self, controller, events, speed=1.0, batch_window=0.0005):
+        """
+        :param controller: the keyboard controller.
+        :param events: KeyEvent list, eg: the result of "KeyJournal.query".
+        :param speed: speed factor, 2.0 means twice as fast.
+        :param batch_window: max interval in seconds between events injected together.
+        """
+        super().__init__(controller, 'PyHotKey-replay')
+        self.__batches = []
+        self.__jitters = []
+        events = sorted(events, key=lambda e: e.timestamp)
+        if events:
+            first = events[0].timestamp
+            window = batch_window * 1e9
+            for e in events:
+                offset = (e.timestamp - first) / speed * 1e9
+                if not self.__batches or offset - self.__batches[-1][0] > window:
+                    self.__batches.append((offset, []))
+                self.__batches[-1][1].append((to_key(e.key, controller._Key, controller._KeyCode), e.pressed))
+
+    def _run(self):
+        pressed = set()
+        start = perf_counter_ns()
+        try:
+            for offset, batch in self.__batches:
+                target = start + int(offset)
+                if not self._sleep_until(target):
+                    break
+                self.__jitters.append(perf_counter_ns() - target)
+                for key, is_press in batch:
+                    if is_press:
+                        self._controller.press(key)
+                        pressed.add(key)
+                    else:
+                        self._controller.release(key)
+                        pressed.discard(key)
+        finally:
+            # Don't leave keys pressed, eg: cancelled, or the events are cut from a longer stream
+            for key in pressed:
+                self._controller.release(key)
+
+    @property
+    def jitter(self):
+        """
+        Return the statistics of the scheduling error in seconds:
+        number of batches, mean, p50, p99 and max.
+        """
+        jitters = sorted(self.__jitters)
+        n = len(jitters)
+        if not n:
+            return {'batches': 0, 'mean': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        return {'batches': n,
+                'mean': sum(jitters) / n / 1e9,
+                'p50': jitters[n // 2] / 1e9,
+                'p99': jitters[min(n - 1, n * 99 // 100)] / 1e9,
+                'max': jitters[-1] / 1e9}
+
+
+# Characters which are typed with a Key -> Key name
+CONTROL_CODES = {'\n': 'enter', '\r': 'enter', '\t': 'tab'}
+_char_keys = {}
+_texts = OrderedDict()
+_texts_lock = Lock()
+MAX_CACHED_TEXTS = 32
+
+
+def resolve_text(string, controller):
+    """
+    Return the keys to type a string, the results of recent strings are cached.
+    :param controller: the keyboard controller, whose backend the keys belong to.
+    :rtype: tuple.
+    """
+    key_class, code_class = controller._Key, controller._KeyCode
+    with _texts_lock:
+        keys = _texts.get((string, key_class))
+        if None is not keys:
+            _texts.move_to_end((string, key_class))
+            return keys
+    keys = []
+    for c in string:
+        key = _char_keys.get((c, key_class))
+        if None is key:
+            name = CONTROL_CODES.get(c)
+            key = _char_keys[(c, key_class)] = key_class[name] if name else code_class.from_char(c)
+        keys.append(key)
+    keys = tuple(keys)
+    with _texts_lock:
+        _texts[(string, key_class)] = keys
+        if MAX_CACHED_TEXTS < len(_texts):
+            _texts.popitem(False)
+    return keys
+
+
+class Typing(InjectionJob):
+    """
+    Type a string in batches of "batch_size" characters, at "cps" characters
+    per second on average.
+    """
+
+    def __init__(self, controller, string, cps=None, batch_size=16):
+        """
+        :param controller: the keyboard controller.
+        :param string: the string to type.
+        :param cps: characters per second, None means as fast as possible.
+        :param batch_size: number of characters typed in a batch.
+        """
+        super().__init__(controller, 'PyHotKey-typing')
+        self.__keys = resolve_text(string, controller)
+        self.__cps = cps
+        self.__batch_size = batch_size
+        self.typed = 0
+
+    def _run(self):
+        keys = self.__keys
+        press, release = self._controller.press, self._controller.release
+        step = self.__batch_size
+        interval = self.__batch_size / self.__cps * 1e9 if self.__cps else 0
+        start = perf_counter_ns()
+        for n, i in enumerate(range(0, len(keys), step)):
+            if interval:
+                if not self._sleep_until(start + int(n * interval)):
+                    break
+            elif self._cancelled.is_set():
+                break
+            for key in keys[i: i + step]:
+                press(key)
+                release(key)
+            self.typed = min(i + step, len(keys))
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Keystroke journal.
+
+Key events are stored as fixed-size binary records in segment files:
+
+    timestamp (float64) | key id (uint32) | flags (uint8) | padding (3 bytes)
+
+Flags: 1 -> pressed, 2 -> suppressed. Key ids are local to the journal, they
+are mapped to keys by the "keys" file (one JSON list [id, vk, char] per line).
+Every "index_interval" records, (timestamp, record number) is appended to the
+"index" file, so a time range can be found without scanning all the records.
+"""
+from os import makedirs
+from json import dumps, loads
+from bisect import bisect_left
+from collections import deque
+from mmap import mmap
+from struct import Struct
+from os.path import join, exists, getsize
+from threading import Thread, Event, Lock
+from ._keys import ColdKey, KeyEvent, get_cold_key
+
+RECORD = Struct('<dIB3x')
+INDEX_ENTRY = Struct('<dQ')
+PRESSED = 1
+SUPPRESSED = 2
+SEGMENT_NAME = 'segment-{:08d}.bin'
+KEYS_NAME = 'keys'
+INDEX_NAME = 'index'
+
+
+class KeyJournal:
+    """
+    Record key events in segmented, memory-mapped files.
+
+    Events are queued by the keyboard listener and written by a background
+    thread, use "query" to read the events between two timestamps.
+    """
+
+    def __init__(self, directory, segment_records=65536, index_interval=256, flush_interval=0.05):
+        """
+        Open a journal, the records of an existing journal are kept.
+        :param directory: directory of the journal.
+        :param segment_records: number of records per segment file.
+        :param index_interval: number of records between two index entries.
+        :param flush_interval: seconds between two writes of the background thread.
+        """
+        self.__directory = directory
+        self.__segment_records = segment_records
+        self.__index_interval = index_interval
+        self.__flush_interval = flush_interval
+        self.__pending = deque()
+        self.__lock = Lock()
+        self.__stopped = Event()
+        self.__segments = []
+        self.__count = 0
+        # Journal key id -> ColdKey, and key id -> journal key id
+        self.__keys = []
+        self.__ids = {}
+        self.__index_timestamps = []
+        self.__index_numbers = []
+        makedirs(directory, exist_ok=True)
+        self.__load()
+        self.__keys_file = open(join(directory, KEYS_NAME), 'a', encoding='utf-8')
+        self.__index_file = open(join(directory, INDEX_NAME), 'ab')
+        self.__writer = Thread(target=self.__run, name='PyHotKey-journal', daemon=True)
+        self.__writer.start()
+
+    def __load(self):
+        path = join(self.__directory, KEYS_NAME)
+        if exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    jid, vk, char = loads(line)
+                    key = ColdKey(vk=vk, char=char)
+                    self.__keys.append(key)
+                    self.__ids[key.id] = jid
+        path = join(self.__directory, INDEX_NAME)
+        if exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            for i in range(0, len(data) - len(data) % INDEX_ENTRY.size, INDEX_ENTRY.size):
+                timestamp, number = INDEX_ENTRY.unpack_from(data, i)
+                self.__index_timestamps.append(timestamp)
+                self.__index_numbers.append(number)
+        n = 0
+        while exists(join(self.__directory, SEGMENT_NAME.format(n))):
+            self.__segments.append(self.__map_segment(n))
+            n += 1
+        if self.__segments:
+            # Records are written in order, the unused tail of the last segment is zero-filled
+            segment = self.__segments[-1]
+            low, high = 0, self.__segment_records
+            while low < high:
+                middle = (low + high) // 2
+                if RECORD.unpack_from(segment, middle * RECORD.size)[0]:
+                    low = middle + 1
+                else:
+                    high = middle
+            self.__count = (len(self.__segments) - 1) * self.__segment_records + low
+
+    def __map_segment(self, n):
+        path = join(self.__directory, SEGMENT_NAME.format(n))
+        size = self.__segment_records * RECORD.size
+        if not exists(path):
+            open(path, 'wb').close()
+        with open(path, 'r+b') as f:
+            if getsize(path) < size:
+                f.truncate(size)
+            return mmap(f.fileno(), size)
+
+    def put(self, kid, timestamp, pressed, suppressed):
+        """Queue a key event, called in the listener thread."""
+        self.__pending.append((kid, timestamp, pressed, suppressed))
+
+    def __journal_id(self, kid):
+        jid = self.__ids.get(kid)
+        if None is jid:
+            key = get_cold_key(kid)
+            jid = self.__ids[kid] = len(self.__keys)
+            self.__keys.append(key)
+            self.__keys_file.write(dumps([jid, key.vk, key.char]) + '\n')
+        return jid
+
+    def __write_pending(self):
+        pending = self.__pending
+        if not pending:
+            return
+        with self.__lock:
+            while pending:
+                kid, timestamp, pressed, suppressed = pending.popleft()
+                segment_number, i = divmod(self.__count, self.__segment_records)
+                if segment_number == len(self.__segments):
+                    self.__segments.append(self.__map_segment(segment_number))
+                RECORD.pack_into(self.__segments[segment_number], i * RECORD.size, timestamp,
+                                 self.__journal_id(kid), (PRESSED if pressed else 0) | (SUPPRESSED if suppressed else 0))
+                if 0 == self.__count % self.__index_interval:
+                    self.__index_timestamps.append(timestamp)
+                    self.__index_numbers.append(self.__count)
+                    self.__index_file.write(INDEX_ENTRY.pack(timestamp, self.__count))
+                self.__count += 1
+            self.__keys_file.flush()
+            self.__index_file.flush()
+
+    def __run(self):
+        while not self.__stopped.wait(self.__flush_interval):
+            self.__write_pending()
+        self.__write_pending()
+
+    def close(self):
+        """Write the queued events and close the journal."""
+        if self.__stopped.is_set():
+            return
+        self.__stopped.set()
+        self.__writer.join()
+        with self.__lock:
+            for segment in self.__segments:
+                segment.flush()
+                segment.close()
+            self.__segments.clear()
+            self.__keys_file.close()
+            self.__index_file.close()
+
+    @property
+    def closed(self):
+        return self.__stopped.is_set()
+
+    def __len__(self):
+        return self.__count
+
+    def query(self, t0=None, t1=None):
+        """
+        Return the events between "t0" and "t1" (inclusive).
+        :param t0: start timestamp, None means from the first event.
+        :param t1: end timestamp, None means to the last event.
+        :rtype: list of KeyEvent.
+        """
+        events = []
+        with self.__lock:
+            if self.__stopped.is_set() and not self.__segments:
+                raise ValueError('the journal is closed')
+            number = 0
+            if None is not t0:
+                # The last index entry before "t0": the records at "t0" may start before an entry at "t0"
+                i = bisect_left(self.__index_timestamps, t0) - 1
+                if 0 <= i:
+                    number = self.__index_numbers[i]
+            while number < self.__count:
+                segment_number, i = divmod(number, self.__segment_records)
+                timestamp, jid, flags = RECORD.unpack_from(self.__segments[segment_number], i * RECORD.size)
+                number += 1
+                if None is not t0 and timestamp < t0:
+                    continue
+                if None is not t1 and timestamp > t1:
+                    break
+                events.append(KeyEvent(self.__keys[jid], bool(flags & PRESSED), timestamp, bool(flags & SUPPRESSED)))
+        return events
@@ -14,34 +14,81 @@
 #
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
-from inspect import signature
+from time import time, perf_counter_ns
+from logging import DEBUG, INFO, WARNING
+from heapq import heappush, heappop
+from threading import Lock
 from itertools import count as _count
 from contextlib import contextmanager
-from ._loggers import default_logger, dummy_logger
-from ._keys import ColdKey, WarmKey, HotKey, MagicKey, to_cold_keys
-from ._platform_stuff import Controller, Listener, filter_name, event_filter
+from ._loggers import default_logger, dummy_logger, prepare_default_logger
+from ._layer import Layer
+from ._sequence import SequenceTrie
+from ._aio import KeyEventStream, running_loop
+from ._stats import Stats
+from ._keys import WarmKey, MagicKey, Sequence, KeyRecord, KeyEvent, MODIFIER_BITS, \
+    to_cold_keys, key_id, to_key_id, get_cold_key, modifier_mask, to_backend_key
+from ._platform_stuff import load_backend
 
 
 class HotKeyboard:
-    def __init__(self):
+    def __init__(self, backend=None):
+        """
+        :param backend: name of the backend, eg: "synthetic" to feed the key events by hand, or a backend
+            module (see "register_backend"). None means the "PYHOTKEY_BACKEND" environment variable,
+            or the backend of the platform.
+        """
+        self.__backend = load_backend(backend)
+        self.__pre_process_key = self.__backend.pre_process_key
         self.__hotkey_id = _count(1)
-        self.__hotkeys = []
-        self.__pressed_keys = []
-        self.__need_released_keys = []
-        self.__released_key = None
-        self.__magickeys = {}
+        # The keyboard's own hotkeys and magickeys are in the base layer, the layers of
+        # "create_layer" are in "__all_layers", "__layers" is the tuple of active layers
+        self.__base_layer = Layer('base', float('-inf'), self.__hotkey_id, self.__get_logger, self.__get_loop,
+                                  self.__autostart_listener)
+        self.__all_layers = {'base': self.__base_layer}
+        self.__layers = (self.__base_layer,)
+        self.__layers_lock = Lock()
+        self.__sequences = SequenceTrie(MODIFIER_BITS)
+        self.__pressed_keys = {}
+        self.__pressed_flags = bytearray(256)
+        # Min-heap of (timestamp, key id) for ttl, and key id -> timestamp of its valid heap entry
+        self.__deadlines = []
+        self.__deadline_entries = {}
+        self.__modifiers = 0
+        self.__need_released_keys = set()
+        self.__taps = {}
+        self.__press_record = KeyRecord()
+        self.__release_record = KeyRecord()
         self.__ttl = 5
         self.__interval = 0.5
         self.__suppress_hotkey = False
         self.__suppress_magickey = False
         self.__triggered = False
+        # Auto-repeat: the last pressed key (None after a release), the key on the fast path and
+        # its verdict, the hotkey or magickey triggered by the key, the last time it was triggered
+        self.__last_press = None
+        self.__repeat_id = None
+        self.__repeat_verdict = None
+        self.__repeat_target = None
+        self.__repeat_at = 0
+        self.__repeat_interval = None
         self.__recording_state = 0
         self.__recording_callback = None
+        self.__dispatcher = None
+        self.__loop = None
+        # Functions receiving every key event: sink(key id, timestamp, pressed, suppressed)
+        self.__sinks = ()
+        self.__sinks_lock = Lock()
+        self.__journal = None
+        # Latency instrumentation, None when disabled
+        self.__stats = None
+        self.__hook_entry = 0
         self.__cur_logger = default_logger
         self.__logger = dummy_logger
-        self.__controller = Controller()
+        self.__logging = False
+        # Created on first use: the controller by "controller", the listener by the first registration
+        self.__controller = None
         self._listener = None
-        self.start_listener()
+        self.__autostart = True
 
     def set_logger(self, logger=default_logger):
         """
@@ -55,6 +102,7 @@ class HotKeyboard:
         :rtype: bool.
         """
         if default_logger is not logger:
+            from inspect import signature
             attrs = ('trace', 'debug', 'info', 'success', 'warning',
                      'error', 'critical', 'exception', 'log')
             for attr in attrs:
@@ -66,31 +114,49 @@ class HotKeyboard:
 
     def toggle_logger(self, on):
         """Turn on or turn off the logger."""
+        if on and default_logger is self.__cur_logger:
+            prepare_default_logger()
         self.__logger = self.__cur_logger if on else dummy_logger
+        self.__logging = bool(on)
+
+    def __log_enabled(self, level):
+        """
+        Whether the logger would handle a message of "level", it doesn't check "self.__logging":
+        the callers check it first, so nothing is called on the hot path when the logger is off.
+        """
+        is_enabled_for = getattr(self.__logger, 'isEnabledFor', None)
+        return None is is_enabled_for or is_enabled_for(level)
 
     @property
     def logger(self):
         """Return the current logger."""
+        if default_logger is self.__cur_logger:
+            prepare_default_logger()
         return self.__cur_logger
 
+    def __to_controller_key(self, key):
+        """Convert a Key or KeyCode of another backend, eg: the package's Key for a synthetic keyboard."""
+        return to_backend_key(key, self.__backend.Key, self.__backend.KeyCode)
+
     def press(self, key):
         """Press a key"""
         if self.__recording_state:
             return
-        self.__controller.press(key)
+        self.controller.press(self.__to_controller_key(key))
 
     def release(self, key):
         """Release a key"""
         if self.__recording_state:
             return
-        self.__controller.release(key)
+        self.controller.release(self.__to_controller_key(key))
 
     def tap(self, key):
         """Press and release a key"""
         if self.__recording_state:
             return
-        self.__controller.press(key)
-        self.__controller.release(key)
+        key = self.__to_controller_key(key)
+        self.controller.press(key)
+        self.controller.release(key)
 
     @contextmanager
     def pressed(self, *keys):
@@ -107,19 +173,63 @@ class HotKeyboard:
         if self.__recording_state:
             yield False
         else:
+            keys = [self.__to_controller_key(key) for key in keys]
             for key in keys:
-                self.__controller.press(key)
+                self.controller.press(key)
             try:
                 yield True
             finally:
                 for key in reversed(keys):
-                    self.__controller.release(key)
+                    self.controller.release(key)
+
+    def type(self, string, cps=None, batch_size=16, background=False):
+        """
+        Type a string.
 
-    def type(self, string):
-        """Type a string"""
+        The keys of the string are resolved once (and cached for recent strings),
+        then typed in batches of "batch_size" characters.
+
+        :param string: the string to type.
+        :param cps: characters per second, None means as fast as possible.
+        :param batch_size: number of characters typed in a batch.
+        :param background: type on a dedicated thread.
+        :return: a Typing job with "wait", "cancel" and "typed" if "background" is True.
+        """
         if self.__recording_state:
-            return
-        self.__controller.type(string)
+            return None
+        if None is not cps and (not isinstance(cps, (int, float)) or 0 >= cps) \
+                or not isinstance(batch_size, int) or 1 > batch_size:
+            self.__logger.info('【Type 0】invalid parameters')
+            return None
+        from ._injection import Typing
+        job = Typing(self.controller, string, cps, batch_size)
+        if background:
+            return job.start()
+        job.run()
+        return None
+
+    def replay(self, events, speed=1.0, batch_window=0.0005):
+        """
+        Replay key events on a dedicated thread, with their original timing.
+        example:
+
+        job = keyboard.replay(keyboard.journal.query(t0, t1), speed=2.0)
+        job.wait()
+        print(job.jitter)
+
+        :param events: KeyEvent list, eg: the result of "journal.query".
+        :param speed: speed factor, 2.0 means twice as fast.
+        :param batch_window: events closer than "batch_window" seconds are injected together.
+        :return: a Replay job with "wait", "cancel" and "jitter", or None.
+        """
+        if self.__recording_state:
+            return None
+        if not isinstance(speed, (int, float)) or 0 >= speed or not isinstance(batch_window, (int, float)) \
+                or 0 > batch_window:
+            self.__logger.info('【Replay 0】invalid parameters')
+            return None
+        from ._injection import Replay
+        return Replay(self.controller, events, speed, batch_window).start()
 
     def register_hotkey(self, keys, count, func, *args, **kwargs):
         """
@@ -133,40 +243,26 @@ class HotKeyboard:
                 -1 -> the hotkey has been registered;
                 positive integer -> hotkey id;
         """
-        if not callable(func):
-            self.__logger.info('【Register hotkey 0】"func" is not callable')
-            return 0
-        keys_new = to_cold_keys(keys)
-        length = len(keys_new)
-        if 0 == length:
-            self.__logger.info('【Register hotkey 0】invalid key list: {}'.format(keys))
-            return 0
-        if 1 == length and (not isinstance(count, int) or 2 > count):
-            self.__logger.info('【Register hotkey 0】invalid "count", "count" must >= 2')
-            return 0
-        hotkey_new = HotKey(keys_new, count, func, *args, **kwargs)
-        for hotkey in self.__hotkeys:
-            if hotkey_new == hotkey:
-                self.__logger.info('【Register hotkey -1】hotkey: {} has been registered'.format(keys_new))
-                return -1
-        hotkey_new.id = next(self.__hotkey_id)
-        self.__hotkeys.append(hotkey_new)
-        self.__logger.info('【Register hotkey 1】{}'.format(hotkey_new))
-        return hotkey_new.id
+        return self.__base_layer.register_hotkey(keys, count, func, *args, **kwargs)
+
+    def register_hotkeys(self, entries):
+        """
+        Register several hotkeys at once, the index is built once for all of them.
+        :param entries: iterable of (keys, count, func), (keys, count, func, args)
+            or (keys, count, func, args, kwargs) tuples, like the parameters of "register_hotkey".
+        :return: a list with the result of "register_hotkey" for each entry:
+                0 -> invalid parameters;
+                -1 -> the hotkey has been registered, or is repeated in "entries";
+                positive integer -> hotkey id;
+        """
+        return self.__base_layer.register_hotkeys(entries)
 
     def unregister_hotkey_by_id(self, id_):
         """
         :param id_: the id of the hotkey to be unregistered.
         :rtype: bool.
         """
-        if isinstance(id_, int) and 0 < id_ <= self.__hotkeys[-1].id:
-            for index, hotkey in enumerate(self.__hotkeys):
-                if id_ == hotkey.id:
-                    self.__hotkeys.pop(index)
-                    self.__logger.info('【Unregister hotkey 1】{}'.format(hotkey))
-                    return True
-        self.__logger.info("【Unregister hotkey 0】hotkey id: {} doesn't exist".format(id_))
-        return False
+        return self.__base_layer.unregister_hotkey_by_id(id_)
 
     def unregister_hotkey_by_keys(self, keys, count=2):
         """
@@ -174,43 +270,122 @@ class HotKeyboard:
         :param count: the target hotkey's count (for hotkey with single keystroke).
         :rtype: bool.
         """
-        keys_new = to_cold_keys(keys)
-        length = len(keys_new)
-        if 0 == length:
-            self.__logger.info('【Unregister hotkey 0】invalid key list: {}'.format(keys))
-            return False
-        if 1 == length and (not isinstance(count, int) or 2 > count):
-            self.__logger.info('【Unregister hotkey 0】invalid "count", "count" must > 1')
-            return False
-        hotkey_temp = HotKey(keys_new, count, None)
-        for index, hotkey in enumerate(self.__hotkeys):
-            if hotkey_temp == hotkey:
-                self.__hotkeys.pop(index)
-                self.__logger.info('【Unregister hotkey 1】{}'.format(hotkey))
-                return True
-        self.__logger.info("【Unregister hotkey 0】hotkey: {} doesn't exists".format(keys_new))
-        return False
+        return self.__base_layer.unregister_hotkey_by_keys(keys, count)
+
+    def load_keymap(self, path, cache_dir=None):
+        """
+        Register the hotkeys of a JSON or TOML keymap file.
+        :param path: path of the keymap.
+        :param cache_dir: directory of the keymap caches, None means no cache.
+        :return: the result of "register_hotkeys" for the hotkeys of the keymap.
+        """
+        return self.__base_layer.load_keymap(path, cache_dir)
+
+    def save_keymap(self, path):
+        """
+        Write the hotkeys in a JSON or TOML keymap file (".toml" for TOML).
+        The functions of the hotkeys must be importable, eg: no lambda.
+        :param path: path of the keymap.
+        """
+        self.__base_layer.save_keymap(path)
+
+    def unregister_hotkeys(self, items):
+        """
+        Unregister several hotkeys at once, the index is built once for all of them.
+        :param items: iterable of hotkey ids, key lists, or (key list, count) pairs.
+        :return: a list of bool, whether each item was unregistered.
+        """
+        return self.__base_layer.unregister_hotkeys(items)
+
+    def get_hotkey(self, id_):
+        """
+        :param id_: the hotkey id.
+        :return: the hotkey, or None.
+        """
+        return self.__base_layer.get_hotkey(id_)
+
+    def enable_hotkey(self, id_):
+        """
+        Enable a hotkey disabled by "disable_hotkey".
+        :param id_: the hotkey id.
+        :rtype: bool.
+        """
+        return self.__base_layer.enable_hotkey(id_)
+
+    def disable_hotkey(self, id_):
+        """
+        Disable a hotkey without unregistering it: it isn't triggered until "enable_hotkey".
+        :param id_: the hotkey id.
+        :rtype: bool.
+        """
+        return self.__base_layer.disable_hotkey(id_)
 
     def unregister_all_hotkeys(self):
-        self.__hotkeys.clear()
-        self.__logger.info("【Unregister all hotkeys】")
-        return True
+        return self.__base_layer.unregister_all_hotkeys()
 
-    def __set_magickey(self, key, on_press, func, *args, **kwargs):
+    def register_sequence(self, steps, timeout, func, *args, **kwargs):
+        """
+        Register a sequence of key combinations, eg: ctrl+k then ctrl+c.
+        Key downs of modifier keys alone don't interrupt a sequence.
+
+        :param steps: a list of key lists, eg: [[Key.ctrl_l, "k"], [Key.ctrl_l, "c"]].
+        :param timeout: the max interval time between two steps,
+            sequences starting with the same steps share the largest timeout.
+        :param func: the function invoked when the sequence is completed.
+        :param args: the arguments of "func".
+        :param kwargs: the keyword arguments of "func".
+        :return:
+                0 -> invalid parameters;
+                -1 -> the sequence, or a sequence starting like it, has been registered;
+                positive integer -> sequence id;
+        """
         if not callable(func):
-            self.__logger.info('【Set magickey 0】"func" is not callable')
-            return False
-        key = ColdKey.from_object(key)
-        if key is None:
-            self.__logger.info('【Set magickey 0】invalid key')
-            return False
-        magickey = self.__magickeys.get(repr(key)) or MagicKey(key)
-        if on_press:
-            magickey.set_func_on_press(func, *args, **kwargs)
-        else:
-            magickey.set_func_on_release(func, *args, **kwargs)
-        self.__magickeys[repr(key)] = magickey
-        self.__logger.info('【Set magickey 1】{}'.format(magickey))
+            self.__logger.info('【Register sequence 0】"func" is not callable')
+            return 0
+        if not isinstance(timeout, (int, float)) or 0 >= timeout:
+            self.__logger.info('【Register sequence 0】invalid "timeout", "timeout" must > 0')
+            return 0
+        if not isinstance(steps, (list, tuple)) or 2 > len(steps):
+            self.__logger.info('【Register sequence 0】invalid steps, a sequence needs 2 steps or more')
+            return 0
+        steps_new = []
+        for step in steps:
+            keys = to_cold_keys(step if isinstance(step, (list, tuple)) else [step])
+            if not keys or all(k.id in MODIFIER_BITS for k in keys):
+                self.__logger.info('【Register sequence 0】invalid step: {}'.format(step))
+                return 0
+            steps_new.append(keys)
+        sequence_new = Sequence(steps_new, timeout, func, *args, **kwargs)
+        if sequence_new.func.coroutine:
+            sequence_new.func.loop = self.__loop or running_loop()
+            if None is sequence_new.func.loop:
+                self.__logger.info('【Register sequence 0】no event loop for the coroutine function')
+                return 0
+        sequence_new.id = next(self.__hotkey_id)
+        if not self.__sequences.add(sequence_new):
+            self.__logger.info('【Register sequence -1】sequence: {} conflicts with a registered sequence'.format(
+                sequence_new))
+            return -1
+        self.__autostart_listener()
+        self.__logger.info('【Register sequence 1】{}'.format(sequence_new))
+        return sequence_new.id
+
+    def unregister_sequence(self, id_):
+        """
+        :param id_: the id of the sequence to be unregistered.
+        :rtype: bool.
+        """
+        if isinstance(id_, int) and 0 < id_:
+            for sequence in self.__sequences:
+                if id_ == sequence.id and self.__sequences.remove(sequence):
+                    self.__logger.info('【Unregister sequence 1】{}'.format(sequence))
+                    return True
+        self.__logger.info("【Unregister sequence 0】sequence id: {} doesn't exist".format(id_))
+        return False
+
+    def unregister_all_sequences(self):
+        self.__sequences.clear()
+        self.__logger.info("【Unregister all sequences】")
         return True
 
     def set_magickey_on_press(self, key, func, *args, **kwargs):
@@ -222,7 +397,7 @@ class HotKeyboard:
         :param kwargs: the keyword arguments of "func".
         :rtype: bool.
         """
-        return self.__set_magickey(key, 1, func, *args, **kwargs)
+        return self.__base_layer.set_magickey_on_press(key, func, *args, **kwargs)
 
     def set_magickey_on_release(self, key, func, *args, **kwargs):
         """
@@ -233,28 +408,7 @@ class HotKeyboard:
         :param kwargs: the keyword arguments of "func".
         :rtype: bool.
         """
-        return self.__set_magickey(key, 0, func, *args, **kwargs)
-
-    def __remove_magickey(self, key, on_press=None):
-        key = ColdKey.from_object(key)
-        if key is None:
-            self.__logger.info('【Remove magickey 0】invalid key')
-            return False
-        magickey = self.__magickeys.get(repr(key))
-        if magickey:
-            if None is on_press:
-                self.__magickeys.pop(repr(key))
-                self.__logger.info('【Remove magickey 1】{}'.format(key))
-            elif on_press:
-                magickey.clear_on_press()
-                self.__logger.info('【Remove magickey on on_press】{}'.format(key))
-            else:
-                magickey.clear_on_release()
-                self.__logger.info('【Remove magickey on release】{}'.format(key))
-            return True
-        else:
-            self.__logger.info('【Remove magickey -1】key: {} is not monitored'.format(key))
-            return False
+        return self.__base_layer.set_magickey_on_release(key, func, *args, **kwargs)
 
     def remove_magickey(self, key):
         """
@@ -262,7 +416,7 @@ class HotKeyboard:
         :param key: target key.
         :rtype: bool.
         """
-        return self.__remove_magickey(key)
+        return self.__base_layer.remove_magickey(key)
 
     def remove_magickey_on_press(self, key):
         """
@@ -270,7 +424,7 @@ class HotKeyboard:
         :param key: target key.
         :rtype: bool.
         """
-        return self.__remove_magickey(key, 1)
+        return self.__base_layer.remove_magickey_on_press(key)
 
     def remove_magickey_on_release(self, key):
         """
@@ -278,34 +432,232 @@ class HotKeyboard:
         :param key: target key.
         :rtype: bool.
         """
-        return self.__remove_magickey(key, 0)
+        return self.__base_layer.remove_magickey_on_release(key)
 
     def remove_all_magickeys(self):
-        self.__magickeys.clear()
-        self.__logger.info('【Remove all magickeys】')
+        return self.__base_layer.remove_all_magickeys()
+
+    def create_layer(self, name, priority=0):
+        """
+        Create a layer of hotkeys and magickeys, it has the registration apis of the keyboard.
+        example:
+
+        gaming = keyboard.create_layer('gaming', priority=1)
+        gaming.register_hotkey([Key.ctrl_l, 'q'], None, func)
+        keyboard.activate_layer('gaming')
+
+        :param name: name of the layer, "base" is the layer of the keyboard's own apis.
+        :param priority: active layers with higher priority are matched first, the base layer is matched last.
+        :return: the layer, or None if the name is invalid or used.
+        """
+        if not isinstance(name, str) or not name or not isinstance(priority, (int, float)):
+            self.__logger.info('【Create layer 0】invalid parameters')
+            return None
+        with self.__layers_lock:
+            if name in self.__all_layers:
+                self.__logger.info('【Create layer -1】layer: {} exists'.format(name))
+                return None
+            layer = self.__all_layers[name] = Layer(name, priority, self.__hotkey_id, self.__get_logger,
+                                                    self.__get_loop)
+        self.__logger.info('【Create layer 1】{}'.format(layer))
+        return layer
+
+    def get_layer(self, name):
+        """Return the layer named "name", or None."""
+        return self.__all_layers.get(name)
+
+    def remove_layer(self, name):
+        """
+        Deactivate and remove a layer, the base layer can't be removed.
+        :rtype: bool.
+        """
+        with self.__layers_lock:
+            layer = self.__all_layers.get(name)
+            if None is layer or layer is self.__base_layer:
+                self.__logger.info("【Remove layer 0】layer: {} doesn't exist or can't be removed".format(name))
+                return False
+            self.__all_layers.pop(name)
+            self.__set_active_layers([la for la in self.__layers if la is not layer])
+        self.__logger.info('【Remove layer 1】{}'.format(layer))
+        return True
+
+    def activate_layer(self, name, exclusive=False):
+        """
+        Activate a layer, eg: to switch to another profile.
+        :param name: name of the layer.
+        :param exclusive: deactivate the other layers (except the base layer).
+        :rtype: bool.
+        """
+        with self.__layers_lock:
+            layer = self.__all_layers.get(name)
+            if None is layer:
+                self.__logger.info("【Activate layer 0】layer: {} doesn't exist".format(name))
+                return False
+            layers = [] if exclusive else [la for la in self.__layers if la is not layer]
+            self.__set_active_layers([layer] + layers)
+        self.__autostart_listener()
+        self.__logger.info('【Activate layer 1】{}'.format(layer))
+        return True
+
+    def deactivate_layer(self, name):
+        """
+        Deactivate a layer, the base layer is always active.
+        :rtype: bool.
+        """
+        with self.__layers_lock:
+            layer = self.__all_layers.get(name)
+            if None is layer or layer is self.__base_layer:
+                self.__logger.info("【Deactivate layer 0】layer: {} doesn't exist or can't be deactivated".format(name))
+                return False
+            self.__set_active_layers([la for la in self.__layers if la is not layer])
+        self.__logger.info('【Deactivate layer 1】{}'.format(layer))
+        return True
+
+    def __set_active_layers(self, layers):
+        """Sort the active layers by priority, the base layer last, and swap them in."""
+        layers = sorted([la for la in layers if la is not self.__base_layer], key=lambda la: -la.priority)
+        self.__layers = tuple(layers) + (self.__base_layer,)
+        # The verdict of a held key may change
+        self.__repeat_id = None
+
+    def __get_logger(self):
+        return self.__logger
+
+    def __get_loop(self):
+        return self.__loop
+
+    @property
+    def layers(self):
+        return list(self.__all_layers.values())
+
+    @property
+    def active_layers(self):
+        """Names of the active layers, in matching order."""
+        return [layer.name for layer in self.__layers]
+
+    def set_dispatcher(self, workers=0, queue_size=64, policy='drop'):
+        """
+        Run the functions of hotkeys and magickeys on a pool of worker threads,
+        so a slow function won't block the keyboard listener.
+
+        :param workers: number of worker threads, 0 means running functions in the listener thread.
+        :param queue_size: max number of pending functions.
+        :param policy: when the queue is full, "drop" the new function or "block" the listener.
+        :rtype: bool.
+        """
+        from ._dispatch import Dispatcher
+        if not isinstance(workers, int) or 0 > workers or not isinstance(queue_size, int) or 1 > queue_size \
+                or policy not in Dispatcher.POLICIES:
+            self.__logger.info('【Set dispatcher 0】invalid parameters')
+            return False
+        dispatcher = self.__dispatcher
+        self.__dispatcher = Dispatcher(workers, queue_size, policy) if workers else None
+        if dispatcher:
+            dispatcher.stop()
+        self.__logger.info('【Set dispatcher 1】workers: {}, queue size: {}, policy: {}'.format(
+            workers, queue_size, policy))
         return True
 
+    def toggle_stats(self, on):
+        """
+        Turn on / off the latency instrumentation, turning it on resets the stats.
+        :param on: bool.
+        """
+        self.__stats = Stats() if on else None
+
+    def stats(self, reset=False):
+        """
+        Return a snapshot of the stats, or None if they are turned off.
+
+        Counters: presses, releases, suppressed, hotkeys, magickeys, dropped (by the dispatcher), errors.
+        Latency histograms, in nanoseconds:
+        verdict (hook entry -> verdict), match (hook entry -> match decision),
+        queue (match decision -> callback start), callback (callback start -> end).
+
+        :param reset: start new stats after the snapshot.
+        """
+        stats = self.__stats
+        if not stats:
+            return None
+        if reset:
+            self.__stats = Stats()
+        return stats.snapshot()
+
+    @property
+    def dispatch_stats(self):
+        """Return the counters of the dispatcher, or None if functions run in the listener thread."""
+        return self.__dispatcher.stats if self.__dispatcher else None
+
     def __trigger_hotkey(self, hotkey):
+        self.__triggered = True
+        stats = self.__stats
+        matched_at = None
+        if stats:
+            matched_at = perf_counter_ns()
+            stats.hotkeys += 1
+            stats.match.record(matched_at - self.__hook_entry)
+        dispatcher = self.__dispatcher
+        if dispatcher:
+            if not dispatcher.submit(self.__call_hotkey, hotkey, matched_at):
+                if stats:
+                    stats.dropped += 1
+                if self.__logging and self.__log_enabled(WARNING):
+                    self.__logger.warning('【HotKey dropped】{}'.format(hotkey))
+        else:
+            self.__call_hotkey(hotkey, matched_at)
+        return self.__suppress_hotkey
+
+    def __call_hotkey(self, hotkey, matched_at=None):
+        stats = self.__stats
+        start = perf_counter_ns() if stats else 0
+        error = False
         try:
-            self.__logger.info('【HotKey triggered】{}'.format(hotkey))
+            if self.__logging and self.__log_enabled(INFO):
+                self.__logger.info('【HotKey triggered】{}'.format(hotkey))
             hotkey()
         except Exception as e:
+            error = True
             e_type = str(type(e))
             self.__logger.error('''【HotKey exception】{}:
 {}: {}'''.format(hotkey, e_type[e_type.find("'") + 1: e_type.rfind("'")], e))
-        finally:
-            self.__triggered = True
-            return self.__suppress_hotkey
+        if stats:
+            stats.called(None if None is matched_at else start - matched_at, perf_counter_ns() - start, error)
 
     def __trigger_magickey(self, magickey, on_press):
+        stats = self.__stats
+        matched_at = None
+        if stats:
+            matched_at = perf_counter_ns()
+            stats.magickeys += 1
+            stats.match.record(matched_at - self.__hook_entry)
+        dispatcher = self.__dispatcher
+        if dispatcher:
+            if not dispatcher.submit(self.__call_magickey, magickey, on_press, matched_at):
+                if stats:
+                    stats.dropped += 1
+                if self.__logging and self.__log_enabled(WARNING):
+                    self.__logger.warning('【MagicKey dropped on {}】{}'.format(
+                        'on_press' if on_press else 'release', magickey.key))
+        else:
+            self.__call_magickey(magickey, on_press, matched_at)
+
+    def __call_magickey(self, magickey, on_press, matched_at=None):
+        stats = self.__stats
+        start = perf_counter_ns() if stats else 0
+        error = False
         try:
-            self.__logger.info('【MagicKey triggered on {}】{}'.format('on_press' if on_press else 'release', magickey.key))
+            if self.__logging and self.__log_enabled(INFO):
+                self.__logger.info('【MagicKey triggered on {}】{}'.format(
+                    'on_press' if on_press else 'release', magickey.key))
             magickey(on_press)
         except Exception as e:
+            error = True
             e_type = str(type(e))
             self.__logger.error('''【MagicKey exception on {}】{}:
 {}: {}'''.format('on_press' if on_press else 'release', magickey.key,
                  e_type[e_type.find("'") + 1: e_type.rfind("'")], e))
+        if stats:
+            stats.called(None if None is matched_at else start - matched_at, perf_counter_ns() - start, error)
 
     def __start_recording_hotkey(self, callback, type_):
         if self.__recording_state:
@@ -313,8 +665,9 @@ class HotKeyboard:
         if callable(callback):
             self.__recording_callback = callback
             self.__recording_state = type_
-            self.__pressed_keys.clear()
-            self.__released_key = None
+            self.__clear_pressed_keys()
+            self.__taps.clear()
+            self.__autostart_listener()
             return True
         return False
 
@@ -335,114 +688,407 @@ class HotKeyboard:
     def stop_recording_hotkey(self):
         """Stop recording hotkey."""
         self.__recording_state = 0
-        self.__pressed_keys.clear()
-        self.__released_key = None
+        self.__clear_pressed_keys()
+        self.__taps.clear()
         self.__logger.info('【Recording stopped】')
 
-    def __update_pressed_keys(self, key, pressed):
-        t = []
-        flag = False
-        ts = key.timestamp
+    def __set_pressed_flag(self, kid, pressed):
+        flags = self.__pressed_flags
+        if kid >= len(flags):
+            flags.extend(bytes(max(kid + 1, 2 * len(flags)) - len(flags)))
+        flags[kid] = pressed
+        bit = MODIFIER_BITS.get(kid)
+        if bit:
+            self.__modifiers = self.__modifiers | bit if pressed else modifier_mask(flags)
+
+    def __clear_pressed_keys(self):
+        self.__last_press = self.__repeat_id = None
+        self.__pressed_keys.clear()
+        self.__deadlines.clear()
+        self.__deadline_entries.clear()
+        self.__pressed_flags[:] = bytes(len(self.__pressed_flags))
+        self.__modifiers = 0
+
+    def __expire_pressed_keys(self, ts):
+        """
+        Remove the keys pressed for more than "ttl" seconds.
+
+        Every pressed key has one entry in the heap, the timestamp of the entry
+        may be older than the key's, because pressing a key again doesn't push a
+        new entry. Outdated entries are pushed again when they reach the top,
+        entries of released keys are dropped.
+        """
+        deadlines = self.__deadlines
+        entries = self.__deadline_entries
+        limit = ts - self.__ttl
+        while deadlines and deadlines[0][0] < limit:
+            timestamp, kid = heappop(deadlines)
+            if entries.get(kid) != timestamp:
+                continue
+            last = self.__pressed_keys.get(kid)
+            if None is not last and limit <= last:
+                heappush(deadlines, (last, kid))
+                entries[kid] = last
+                continue
+            entries.pop(kid)
+            if None is not last:
+                self.__pressed_keys.pop(kid)
+                self.__set_pressed_flag(kid, 0)
+
+    def __update_pressed_keys(self, record, pressed):
+        """Return True if the key was already pressed."""
+        kid = record.id
         if pressed:
-            for k in self.__pressed_keys:
-                if ts - k.timestamp > self.__ttl:
-                    continue
-                if key == k:
-                    flag = True
-                    continue
-                t.append(k)
-            t.append(key)
-            self.__pressed_keys = t
+            self.__expire_pressed_keys(record.timestamp)
+            flag = kid in self.__pressed_keys
+            if flag:
+                self.__pressed_keys.pop(kid)
+            else:
+                if kid not in self.__deadline_entries:
+                    heappush(self.__deadlines, (record.timestamp, kid))
+                    self.__deadline_entries[kid] = record.timestamp
+                self.__set_pressed_flag(kid, 1)
+            self.__pressed_keys[kid] = record.timestamp
+            return flag
+        if None is not self.__pressed_keys.pop(kid, None):
+            self.__set_pressed_flag(kid, 0)
+        return False
+
+    def __update_released_keys(self, record):
+        """Count the taps of a released key. Only keys with single key hotkeys are counted."""
+        for layer in self.__layers:
+            if layer._hotkeys.has_taps(record.id):
+                break
         else:
-            for i, k in enumerate(self.__pressed_keys):
-                if key == k:
-                    self.__pressed_keys.pop(i)
-                    break
-        return flag
+            return False
+        tap = self.__taps.get(record.id)
+        if tap is None:
+            tap = self.__taps[record.id] = KeyRecord(record.id)
+        tap.n = tap.n + 1 if record.timestamp - tap.timestamp <= self.__interval else 1
+        tap.timestamp = record.timestamp
+        record.n = tap.n
+        return True
+
+    def __match_magickey(self, kid):
+        """Return the magickey of "kid" in the active layer with the highest priority, or None."""
+        for layer in self.__layers:
+            magickey = layer._magickeys.get(kid)
+            if magickey:
+                return magickey
+        return None
+
+    def __warm_keys(self, pressed_keys):
+        return [WarmKey.from_id(kid, ts) for kid, ts in pressed_keys.items()]
+
+    def __add_sink(self, sink):
+        with self.__sinks_lock:
+            self.__sinks += (sink,)
+        self.__autostart_listener()
+
+    def __remove_sink(self, sink):
+        with self.__sinks_lock:
+            self.__sinks = tuple(s for s in self.__sinks if s != sink)
 
-    def __update_released_keys(self, key):
-        if key == self.__released_key and key.timestamp - self.__released_key.timestamp <= self.__interval:
-            key.n = self.__released_key.n + 1
-        self.__released_key = key
+    def __sink_failed(self, sink, e):
+        """Remove a sink which raised an exception, an exception must not stop the listener."""
+        self.__remove_sink(sink)
+        e_type = str(type(e))
+        self.__logger.error('【Sink removed】{}: {}'.format(e_type[e_type.find("'") + 1: e_type.rfind("'")], e))
 
     def _on_press(self, key):
-        key = WarmKey(key)
+        stats = self.__stats
+        if stats:
+            self.__hook_entry = perf_counter_ns()
+        record = self.__press_record
+        record.id = key_id(self.__pre_process_key(key))
+        record.timestamp = time()
+        r = self.__on_press(record)
+        sinks = self.__sinks
+        if sinks:
+            for sink in sinks:
+                try:
+                    sink(record.id, record.timestamp, True, bool(r))
+                except Exception as e:
+                    self.__sink_failed(sink, e)
+        if stats:
+            stats.event(True, r, perf_counter_ns() - self.__hook_entry)
+        return r
+
+    def _on_release(self, key):
+        stats = self.__stats
+        if stats:
+            self.__hook_entry = perf_counter_ns()
+        record = self.__release_record
+        record.id = key_id(self.__pre_process_key(key))
+        record.timestamp = time()
+        record.n = 1
+        r = self.__on_release(record)
+        sinks = self.__sinks
+        if sinks:
+            for sink in sinks:
+                try:
+                    sink(record.id, record.timestamp, False, bool(r))
+                except Exception as e:
+                    self.__sink_failed(sink, e)
+        if stats:
+            stats.event(False, r, perf_counter_ns() - self.__hook_entry)
+        return r
+
+    def __on_repeat(self, record):
+        """
+        Handle an auto-repeat of the last pressed key: refresh its timestamp, trigger its
+        hotkey or magickey again if "repeat_interval" is set, and return the cached verdict.
+        Pressed keys aren't expired here, the keys held with the repeated key stay pressed:
+        a key down is only an auto-repeat within "interval" (always below "ttl") of the
+        previous one, later key downs take the full path.
+        """
+        self.__pressed_keys[record.id] = record.timestamp
+        target = self.__repeat_target
+        if target and self.__repeat_interval and record.timestamp - self.__repeat_at >= self.__repeat_interval:
+            self.__repeat_at = record.timestamp
+            if isinstance(target, MagicKey):
+                if target.on_press:
+                    self.__trigger_magickey(target, 1)
+            elif target.enabled:
+                self.__trigger_hotkey(target)
+        return self.__repeat_verdict
+
+    def __on_press(self, record):
+        if record.id == self.__repeat_id \
+                and record.timestamp - self.__pressed_keys.get(record.id, 0) < self.__interval:
+            return self.__on_repeat(record)
+        self.__repeat_id = None
         if 1 == self.__recording_state:
-            self.__update_pressed_keys(key, True)
+            self.__update_pressed_keys(record, True)
             return True
         if 2 == self.__recording_state:
-            if key in self.__pressed_keys:
+            if record.id in self.__pressed_keys:
                 return True
-            self.__pressed_keys.append(key)
+            self.__pressed_keys[record.id] = record.timestamp
+            self.__set_pressed_flag(record.id, 1)
             if 1 < len(self.__pressed_keys):
-                self.__recording_callback(self.__pressed_keys)
+                self.__recording_callback(self.__warm_keys(self.__pressed_keys))
             return True
-        magickey = self.__magickeys.get(repr(key))
-        if self.__update_pressed_keys(key, True):
-            if magickey and self.__suppress_magickey:
-                return True
-            return self.__triggered
+        magickey = self.__match_magickey(record.id)
+        if self.__update_pressed_keys(record, True):
+            verdict = True if magickey and self.__suppress_magickey else self.__triggered
+            if record.id == self.__last_press:
+                # The first repeat takes the full path, the next ones take the fast path
+                self.__repeat_id = record.id
+                self.__repeat_verdict = verdict
+                return self.__on_repeat(record)
+            return verdict
+        self.__last_press = record.id
+        self.__repeat_target = None
+        self.__repeat_at = record.timestamp
         if 1 == len(self.__pressed_keys):
             if magickey:
                 if magickey.on_press:
+                    self.__repeat_target = magickey
                     self.__trigger_magickey(magickey, 1)
                 if self.__suppress_magickey:
                     return True
         if magickey:
-            self.__need_released_keys.append(key)
+            self.__need_released_keys.add(record.id)
         self.__triggered = False
-        if not self.__recording_state:
-            self.__logger.debug('【Key down】{}'.format(key))
-        length = len(self.__pressed_keys)
-        if 1 == length:
+        if self.__logging and not self.__recording_state and self.__log_enabled(DEBUG):
+            self.__logger.debug('【Key down】{}'.format(get_cold_key(record.id)))
+        sequence = self.__sequences.advance(record.id, self.__pressed_keys.keys(), record.timestamp)
+        if sequence:
+            return self.__trigger_hotkey(sequence)
+        if 1 == len(self.__pressed_keys):
             return
-        for hotkey in self.__hotkeys:
-            if len(hotkey.keys) == length and all((k in self.__pressed_keys for k in hotkey.keys)):
+        for layer in self.__layers:
+            hotkey = layer._hotkeys.match_combination(self.__pressed_keys.keys())
+            if hotkey and hotkey.enabled:
+                self.__repeat_target = hotkey
                 return self.__trigger_hotkey(hotkey)
 
-    def _on_release(self, key):
-        key = WarmKey(key)
+    def __on_release(self, record):
+        self.__last_press = self.__repeat_id = None
         if 1 == self.__recording_state:
-            self.__recording_callback([key])
+            self.__recording_callback([WarmKey.from_id(record.id, record.timestamp)])
             return True
         if 2 == self.__recording_state:
-            self.__pressed_keys = [k for k in self.__pressed_keys if k != key]
+            self.__update_pressed_keys(record, False)
             return True
-        self.__update_pressed_keys(key, False)
-        self.__update_released_keys(key)
+        self.__update_pressed_keys(record, False)
+        tapped = self.__update_released_keys(record)
         if not self.__pressed_keys:
-            magickey = self.__magickeys.get(repr(key))
+            magickey = self.__match_magickey(record.id)
             if magickey:
                 if magickey.on_release:
                     self.__trigger_magickey(magickey, 0)
                 if self.__suppress_magickey:
-                    for i, k in enumerate(self.__need_released_keys):
-                        if key == k:
-                            self.__need_released_keys.pop(i)
-                            break
+                    if record.id in self.__need_released_keys:
+                        self.__need_released_keys.discard(record.id)
                     else:
                         return True
-        if not self.__recording_state:
-            self.__logger.debug('【Key up】{}'.format(key))
-        for hotkey in self.__hotkeys:
-            if 1 == len(hotkey.keys) and hotkey.keys[0] == self.__released_key \
-                    and hotkey.count == self.__released_key.n:
-                return self.__trigger_hotkey(hotkey)
+        if self.__logging and not self.__recording_state and self.__log_enabled(DEBUG):
+            self.__logger.debug('【Key up】{}'.format(get_cold_key(record.id)))
+        if tapped:
+            for layer in self.__layers:
+                hotkey = layer._hotkeys.match_tap(record.id, record.n)
+                if hotkey and hotkey.enabled:
+                    return self.__trigger_hotkey(hotkey)
 
     def __event_filter(self, *args, **kwargs):
-        return event_filter(self, *args, **kwargs)
+        return self.__backend.event_filter(self, *args, **kwargs)
+
+    def start_journal(self, directory, segment_records=65536, index_interval=256):
+        """
+        Record the key events in a binary journal.
+        If the journal exists, new events are appended to it.
+
+        :param directory: directory of the journal.
+        :param segment_records: number of records per segment file.
+        :param index_interval: number of records between two index entries.
+        :rtype: bool.
+        """
+        if None is not self.__journal:
+            self.__logger.info('【Start journal 0】journal is running: {}'.format(self.__journal))
+            return False
+        from ._journal import KeyJournal
+        try:
+            self.__journal = KeyJournal(directory, segment_records, index_interval)
+        except (OSError, ValueError) as e:
+            self.__logger.error('【Start journal 0】{}'.format(e))
+            return False
+        self.__add_sink(self.__journal.put)
+        self.__logger.info('【Start journal 1】{}'.format(directory))
+        return True
+
+    def stop_journal(self):
+        """Stop recording the key events and close the journal."""
+        journal = self.__journal
+        if None is journal:
+            return False
+        self.__journal = None
+        self.__remove_sink(journal.put)
+        journal.close()
+        self.__logger.info('【Stop journal】')
+        return True
+
+    @property
+    def journal(self):
+        """Return the running journal, or None."""
+        return self.__journal
+
+    @property
+    def event_loop(self):
+        """
+        The event loop to run coroutine functions of hotkeys and magickeys.
+        If it's None, the running loop at registration is used.
+        """
+        return self.__loop
+
+    @event_loop.setter
+    def event_loop(self, loop):
+        self.__loop = loop
+
+    async def wait_hotkey(self, keys, count=None):
+        """
+        Wait until a hotkey is triggered.
+        example:
+
+        await keyboard.wait_hotkey([Key.ctrl_l, 'z'])
+
+        :param keys: a key list, eg: [Key.ctrl_l, Key.alt_l, "z"].
+        :param count: tap a single key "count" times to trigger the hotkey (must >= 2).
+        """
+        loop = running_loop()
+        future = loop.create_future()
+
+        def done():
+            if not future.done():
+                future.set_result(None)
+        id_ = self.register_hotkey(keys, count, loop.call_soon_threadsafe, done)
+        if 0 == id_:
+            raise ValueError('invalid hotkey: {}'.format(keys))
+        if -1 == id_:
+            raise ValueError('the hotkey has been registered: {}'.format(keys))
+        try:
+            await future
+        finally:
+            self.unregister_hotkey_by_id(id_)
+
+    async def events(self, maxsize=1024):
+        """
+        Iterate over the key events.
+        example:
+
+        async for event in keyboard.events():
+            print(event.key, event.pressed)
+
+        :param maxsize: max number of buffered events, the oldest event is dropped when the buffer is full.
+        """
+        stream = KeyEventStream(running_loop(), maxsize)
+
+        def sink(kid, timestamp, pressed, suppressed):
+            stream.put(KeyEvent(get_cold_key(kid), pressed, timestamp, suppressed))
+        self.__add_sink(sink)
+        try:
+            while True:
+                yield await stream.get()
+        finally:
+            self.__remove_sink(sink)
+
+    def subscribe(self, maxsize=1024, policy='drop_oldest'):
+        """
+        Receive the key events in a bounded queue, which can be read by other threads.
+        example:
+
+        with keyboard.subscribe() as queue:
+            while True:
+                for event in queue.drain(256, timeout=1):
+                    print(event.key, event.pressed)
+
+        :param maxsize: max number of buffered events.
+        :param policy: when the queue is full, "drop_oldest" or "drop_newest" event is dropped.
+        :return: a KeyEventQueue, "close" it to unsubscribe; None if the parameters are invalid.
+        """
+        from ._events import KeyEventQueue
+        if not isinstance(maxsize, int) or 1 > maxsize or policy not in KeyEventQueue.POLICIES:
+            self.__logger.info('【Subscribe 0】invalid parameters')
+            return None
+        queue = KeyEventQueue(maxsize, policy, lambda q: self.__remove_sink(q.put))
+        self.__add_sink(queue.put)
+        self.__logger.info('【Subscribe 1】max size: {}, policy: {}'.format(maxsize, policy))
+        return queue
 
     @property
     def hotkeys(self):
-        return self.__hotkeys.copy()
+        return self.__base_layer.hotkeys
+
+    @property
+    def sequences(self):
+        return list(self.__sequences)
 
     @property
     def pressed_keys(self):
-        return self.__pressed_keys.copy()
+        self.__autostart_listener()
+        return self.__warm_keys(self.__pressed_keys.copy())
+
+    def is_pressed(self, key):
+        """
+        Check whether a key is pressed.
+        :param key: a Key, KeyCode or single character.
+        :rtype: bool.
+        """
+        self.__autostart_listener()
+        kid = to_key_id(key)
+        flags = self.__pressed_flags
+        return None is not kid and kid < len(flags) and 1 == flags[kid]
+
+    @property
+    def modifiers(self):
+        """Return the mask of the pressed modifier keys, eg: Modifier.CTRL | Modifier.SHIFT."""
+        self.__autostart_listener()
+        return self.__modifiers
 
     @property
     def magickeys(self):
-        return list(self.__magickeys.values())
+        return self.__base_layer.magickeys
 
     @property
     def recording_state(self):
@@ -486,6 +1132,29 @@ class HotKeyboard:
         else:
             self.__interval = 0.3
 
+    @property
+    def repeat_interval(self):
+        return self.__repeat_interval
+
+    @repeat_interval.setter
+    def repeat_interval(self, i):
+        if isinstance(i, (int, float)) and 0 < i:
+            self.__repeat_interval = i
+        else:
+            self.__repeat_interval = None
+
+    @property
+    def listener(self):
+        """The keyboard listener, eg: the synthetic backend's listener has "press", "release" and "feed"."""
+        return self._listener
+
+    @property
+    def controller(self):
+        """The keyboard controller, eg: the synthetic backend's controller records the sent events."""
+        if None is self.__controller:
+            self.__controller = self.__backend.Controller()
+        return self.__controller
+
     @property
     def listener_running(self):
         return self._listener.running if self._listener else False
@@ -493,22 +1162,54 @@ class HotKeyboard:
     def start_listener(self):
         if self.listener_running:
             return
-        self._listener = Listener(on_press=lambda k: self._on_press(k) or True,
-                                  on_release=lambda k: self._on_release(k) or True) if None is filter_name \
-            else Listener(**{filter_name: self.__event_filter})
+        backend = self.__backend
+        self._listener = backend.Listener(on_press=lambda k: self._on_press(k) or True,
+                                          on_release=lambda k: self._on_release(k) or True) \
+            if None is backend.filter_name else backend.Listener(**{backend.filter_name: self.__event_filter})
         self._listener.start()
         self.__logger.debug('【Keyboard listener started】——————————————————>')
 
     def wait_listener(self):
+        if None is self._listener:
+            self.start_listener()
         self._listener.wait()
 
+    def update_layout(self):
+        """Call this after switching the keyboard layout, the cached key translations are dropped."""
+        self.__backend.update_layout()
+        self.__logger.debug('【Keyboard layout updated】')
+
     def stop_listener(self):
         self.__recording_state = 0
-        self.__pressed_keys.clear()
+        self.__clear_pressed_keys()
         self.__need_released_keys.clear()
-        self.__released_key = None
-        self._listener.stop()
+        self.__taps.clear()
+        self.__sequences.reset()
+        self.__autostart = False
+        if self._listener:
+            self._listener.stop()
         self.__logger.debug('【Keyboard listener ended】<——————————————————')
 
+    def __autostart_listener(self):
+        """
+        Start the listener on the first registration or the first check of the pressed keys,
+        unless it has been started or stopped before.
+        """
+        if self.__autostart:
+            self.__autostart = False
+            if None is self._listener:
+                self.start_listener()
+
+
+_keyboard = None
+_keyboard_lock = Lock()
+
 
-keyboard = HotKeyboard()
+def get_keyboard():
+    """Return the default keyboard, it is created on the first call."""
+    global _keyboard
+    if None is _keyboard:
+        with _keyboard_lock:
+            if None is _keyboard:
+                _keyboard = HotKeyboard()
+    return _keyboard
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Keymap files.
+
+A keymap is a JSON or TOML file (chosen by the ".toml" extension) with a list
+of hotkeys:
+
+    [[hotkeys]]
+    keys = ["ctrl_l", "alt_l", "z"]
+    func = "package.module:function"
+    args = [1]
+    kwargs = {name = "undo"}
+
+    [[hotkeys]]
+    keys = ["caps_lock"]
+    count = 3
+    func = "package.module:function"
+
+Keys are Key names ("ctrl_l"), characters ("z") or virtual key codes ("<65>"),
+functions are import paths: "module:attribute" or "module.attribute".
+A virtual key code only matches the key events without a character, keys
+are identified by their character when they have one.
+
+The normalized keymap can be cached in a JSON file named after the sha256
+of the keymap file, so the next load of the same file skips the parsing and
+the normalization.
+"""
+from os import makedirs, replace, fspath
+from json import dumps, loads
+from hashlib import sha256
+from importlib import import_module
+from os.path import join, exists
+from ._info import VERSION
+from ._keys import Key, KeyCode, get_cold_key, to_key_id, _intern
+
+# Bump when the content of the cache files changes
+CACHE_FORMAT = 2
+CACHE_NAME = 'keymap-{}.json'
+
+
+def key_name(key):
+    """Return the name of a ColdKey in a keymap file."""
+    if key.char:
+        return key.char
+    return '<{}>'.format(key.vk)
+
+
+def parse_key_name(name):
+    """
+    Return the ColdKey of a key name, or None.
+    :param name: a Key name, a character or a virtual key code, eg: "<65>".
+    """
+    if not isinstance(name, str) or not name:
+        return None
+    if name in Key.__members__:
+        return get_cold_key(to_key_id(Key[name]))
+    if 2 < len(name) and name.startswith('<') and name.endswith('>') and name[1:-1].isdigit():
+        return get_cold_key(to_key_id(KeyCode.from_vk(int(name[1:-1]))))
+    kid = to_key_id(name)
+    return None if None is kid else get_cold_key(kid)
+
+
+def func_path(func):
+    """
+    Return the import path of a function.
+    :raise ValueError: "func" can't be imported, eg: a lambda or a nested function.
+    """
+    module = getattr(func, '__module__', None)
+    name = getattr(func, '__qualname__', None)
+    if not module or not name or '<' in name:
+        raise ValueError('function {!r} has no import path'.format(func))
+    return '{}:{}'.format(module, name)
+
+
+def resolve_func(path):
+    """
+    Import a function by its path: "module:attribute" or "module.attribute".
+    :raise ValueError: the function can't be imported.
+    """
+    if not isinstance(path, str):
+        raise ValueError('invalid function path: {!r}'.format(path))
+    module, _, name = path.partition(':') if ':' in path else path.rpartition('.')
+    try:
+        obj = import_module(module)
+        for attr in name.split('.'):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise ValueError('invalid function path: {!r} ({})'.format(path, e)) from None
+    if not callable(obj):
+        raise ValueError('{!r} is not callable'.format(path))
+    return obj
+
+
+def _parse(data, toml):
+    if toml:
+        try:
+            from tomllib import loads as toml_loads
+        except ImportError:
+            try:
+                from tomli import loads as toml_loads
+            except ImportError:
+                raise ImportError('TOML keymaps need Python 3.11+ or the "tomli" package') from None
+        return toml_loads(data.decode('utf-8'))
+    return loads(data.decode('utf-8'))
+
+
+def _normalize(document):
+    """
+    Return the entries of a parsed keymap: (key ids, count, function path, args, kwargs).
+    The key ids of an entry are unique, and the count of a single key is valid.
+    """
+    hotkeys = document.get('hotkeys') if isinstance(document, dict) else None
+    if not isinstance(hotkeys, list):
+        raise ValueError('a keymap needs a "hotkeys" list')
+    entries = []
+    for i, hotkey in enumerate(hotkeys):
+        if not isinstance(hotkey, dict) or not isinstance(hotkey.get('keys'), list) or 'func' not in hotkey:
+            raise ValueError('hotkey {}: "keys" and "func" are required'.format(i))
+        keys = [parse_key_name(name) for name in hotkey['keys']]
+        if not keys or None in keys:
+            raise ValueError('hotkey {}: invalid keys: {}'.format(i, hotkey['keys']))
+        ids = list(dict.fromkeys([k.id for k in keys]))
+        count = hotkey.get('count')
+        if 1 == len(ids) and (not isinstance(count, int) or isinstance(count, bool) or 2 > count):
+            raise ValueError('hotkey {}: a single key needs a "count" >= 2'.format(i))
+        args = hotkey.get('args', [])
+        kwargs = hotkey.get('kwargs', {})
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise ValueError('hotkey {}: "args" must be a list and "kwargs" a table'.format(i))
+        entries.append((ids, count if 1 == len(ids) else None, hotkey['func'], tuple(args), kwargs))
+    return entries
+
+
+def load_keymap(path, cache_dir=None):
+    """
+    Read a keymap file.
+
+    :param path: path of a JSON or TOML keymap.
+    :param cache_dir: directory of the cache files, None means no cache.
+    :return: a list of (keys, count, func, args, kwargs) tuples for "register_hotkeys",
+        the keys are ColdKey lists without duplicates.
+    :raise ValueError: the keymap is invalid.
+    """
+    path = fspath(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    cache = None
+    if cache_dir:
+        digest = sha256(data)
+        digest.update('{}:{}:{}'.format(CACHE_FORMAT, VERSION, path.endswith('.toml')).encode())
+        cache = join(cache_dir, CACHE_NAME.format(digest.hexdigest()))
+    entries = None
+    if cache and exists(cache):
+        try:
+            with open(cache, 'rb') as f:
+                tokens, entries = loads(f.read().decode('utf-8'))
+            # Key ids are local to the process, the cache stores (vk, char) tokens
+            ids = [_intern(vk, char) for vk, char in tokens]
+            entries = [([ids[i] for i in keys], count, func, tuple(args), kwargs)
+                       for keys, count, func, args, kwargs in entries]
+        except (OSError, ValueError, TypeError, IndexError):
+            entries = None
+    if None is entries:
+        entries = _normalize(_parse(data, path.endswith('.toml')))
+        if cache:
+            makedirs(cache_dir, exist_ok=True)
+            _write_cache(cache, entries)
+    funcs = {name: resolve_func(name) for name in {entry[2] for entry in entries}}
+    return [([get_cold_key(kid) for kid in keys], count, funcs[func], args, kwargs)
+            for keys, count, func, args, kwargs in entries]
+
+
+def _write_cache(cache, entries):
+    ids = {}
+    tokens = []
+    cached = []
+    for keys, count, func, args, kwargs in entries:
+        indexes = []
+        for kid in keys:
+            if kid not in ids:
+                key = get_cold_key(kid)
+                ids[kid] = len(tokens)
+                tokens.append((key.vk, key.char))
+            indexes.append(ids[kid])
+        cached.append((indexes, count, func, args, kwargs))
+    try:
+        # Eg: TOML dates in the arguments can't be written in JSON, the keymap isn't cached
+        data = dumps([tokens, cached])
+    except (TypeError, ValueError):
+        return
+    temp = cache + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(data)
+    replace(temp, cache)
+
+
+def _toml_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float, str)):
+        return dumps(value)
+    if isinstance(value, (list, tuple)):
+        return '[{}]'.format(', '.join([_toml_value(v) for v in value]))
+    if isinstance(value, dict):
+        return '{{{}}}'.format(', '.join(['{} = {}'.format(dumps(str(k)), _toml_value(v)) for k, v in value.items()]))
+    raise ValueError('{!r} can\'t be written in a keymap'.format(value))
+
+
+def save_keymap(path, hotkeys):
+    """
+    Write hotkeys in a keymap file.
+    :param path: path of the keymap, ".toml" for TOML, JSON otherwise.
+    :param hotkeys: HotKey list.
+    :raise ValueError: a function has no import path, or an argument can't be written.
+    """
+    path = fspath(path)
+    items = []
+    for hotkey in hotkeys:
+        item = {'keys': [key_name(k) for k in hotkey.keys]}
+        if 1 == len(hotkey.keys):
+            item['count'] = hotkey.count
+        item['func'] = func_path(hotkey.func.func)
+        if hotkey.func.args:
+            item['args'] = list(hotkey.func.args)
+        if hotkey.func.kwargs:
+            item['kwargs'] = dict(hotkey.func.kwargs)
+        items.append(item)
+    if path.endswith('.toml'):
+        lines = []
+        for item in items:
+            lines.append('[[hotkeys]]')
+            lines.extend(['{} = {}'.format(k, _toml_value(v)) for k, v in item.items()])
+            lines.append('')
+        text = '\n'.join(lines)
+    else:
+        try:
+            text = dumps({'hotkeys': items}, indent=2)
+        except TypeError as e:
+            raise ValueError(str(e)) from None
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -15,19 +15,132 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 from time import time
+from enum import Enum, IntFlag
+from threading import Lock
+from collections import namedtuple
+from types import CoroutineType
 from ._platform_stuff import Key, KeyCode, pre_process_key
+# The KeyCode of every backend
+from pynput.keyboard._base import KeyCode as BaseKeyCode
+
+# Canonical form of a key (char or vk) -> key id
+_ids = {}
+# Key id -> ColdKey
+_keys = []
+# Caches of "key_id"
+_member_ids = {}
+_code_ids = {}
+_lock = Lock()
+
+
+def _intern(vk, char):
+    """
+    Return the id of the key with "vk" and "char", allocate a new one if necessary.
+    :param vk: virtual key code.
+    :param char: lowercase character or Key name.
+    :rtype: int.
+    """
+    token = char or vk
+    kid = _ids.get(token)
+    if kid is None:
+        with _lock:
+            kid = _ids.get(token)
+            if kid is None:
+                key = ColdKey.__new__(ColdKey)
+                KeyCode.__init__(key, vk, char, False)
+                key.id = kid = len(_keys)
+                _keys.append(key)
+                _ids[token] = kid
+    return kid
+
+
+def key_id(key):
+    """
+    Return the id of a Key or KeyCode.
+
+    Two keys have the same id if they are the same key, ids are small integers
+    and they are cached, so use them whenever a key needs to be compared or
+    looked up. Key members are identified by their names, so the keys of all
+    the backends share the same ids.
+    :param key: a Key or KeyCode, of any backend.
+    :rtype: int.
+    """
+    if isinstance(key, Enum):
+        kid = _member_ids.get(key)
+        if kid is None:
+            kid = _member_ids[key] = _intern(key.value.vk, key.name)
+        return kid
+    if isinstance(key, ColdKey):
+        return key.id
+    codes = _code_ids.get(key.vk)
+    kid = codes.get(key.char) if codes else None
+    if kid is None:
+        kid = _code_ids.setdefault(key.vk, {})[key.char] = _intern(key.vk, key.char.lower() if key.char else None)
+    return kid
+
+
+def to_key_id(obj):
+    """
+    Return the id of an unknown object.
+    :param obj: unknown object.
+    :return: an int or None.
+    """
+    if is_key(obj):
+        return key_id(obj)
+    if isinstance(obj, str) and 1 == len(obj):
+        return _intern(None, obj.lower())
+    return None
+
+
+def get_cold_key(kid):
+    """Return the ColdKey of a key id."""
+    return _keys[kid]
+
+
+def is_key(obj):
+    """Return whether an object is a Key or KeyCode of any backend."""
+    return isinstance(obj, BaseKeyCode) or isinstance(obj, Enum) and isinstance(obj.value, BaseKeyCode)
+
+
+def to_key(key, keys=Key, codes=KeyCode):
+    """
+    Return the Key or KeyCode which can be sent to the keyboard controller.
+    :param key: a ColdKey.
+    :param keys: Key of the controller's backend.
+    :param codes: KeyCode of the controller's backend.
+    """
+    if key.char:
+        if 1 < len(key.char) and key.char in keys.__members__:
+            return keys[key.char]
+        return codes.from_char(key.char)
+    return codes.from_vk(key.vk)
+
+
+def to_backend_key(key, keys, codes):
+    """
+    Return the key of another backend: Key members are matched by name,
+    KeyCodes are copied, other objects (eg: characters) are returned as is.
+    :param keys: Key of the backend.
+    :param codes: KeyCode of the backend.
+    """
+    if isinstance(key, Enum):
+        return key if isinstance(key, keys) else keys[key.name]
+    if isinstance(key, BaseKeyCode) and not isinstance(key, codes):
+        return codes(vk=key.vk, char=key.char, is_dead=key.is_dead)
+    return key
 
 
 class ColdKey(KeyCode):
     """ColdKey = KeyCode + Key"""
 
     def __init__(self, key=None, vk=None, char=None, **kwargs):
-        if isinstance(key, Key):
+        if isinstance(key, Enum):
             super().__init__(key.value.vk, key.name)
-        elif isinstance(key, KeyCode):
+        elif isinstance(key, BaseKeyCode):
             super().__init__(key.vk, key.char.lower() if key.char else None)
         else:
             super().__init__(vk, char.lower() if char else None, False, **kwargs)
+        self.id = _intern(self.vk, self.char)
 
     @classmethod
     def from_object(cls, obj):
@@ -42,27 +155,38 @@ class ColdKey(KeyCode):
             return obj
         elif isinstance(obj, str) and 1 == len(obj):
             return cls(char=obj)
-        elif isinstance(obj, (Key, KeyCode)):
+        elif is_key(obj):
             return cls(obj)
         else:
             return None
 
-    def __compare(self, other):
-        return self.char == other.char if self.char and other.char else self.vk == other.vk
-
     def __eq__(self, other):
         if isinstance(other, ColdKey):
-            return self.__compare(other)
-        elif isinstance(other, (Key, ColdKey)):
-            return self.__compare(ColdKey(other))
-        elif isinstance(other, str) and 1 == len(other):
-            return self.__compare(ColdKey(char=other))
-        return False
+            return self.id == other.id
+        return self.id == to_key_id(other)
+
+    def __hash__(self):
+        return self.id
 
     def __repr__(self):
         return super().__repr__().strip("'")
 
 
+class KeyRecord:
+    """
+    A compact record of a key event, used internally instead of WarmKey.
+
+    Records are preallocated and reused, so handling a key event doesn't
+    create any key object.
+    """
+    __slots__ = ('id', 'timestamp', 'n')
+
+    def __init__(self, kid=None, timestamp=0.0, n=1):
+        self.id = kid
+        self.timestamp = timestamp
+        self.n = n
+
+
 class WarmKey(ColdKey):
     """WarmKey represents a pressed or just released key."""
 
@@ -76,6 +200,21 @@ class WarmKey(ColdKey):
         self.timestamp = timestamp
         self.n = n
 
+    @classmethod
+    def from_id(cls, kid, timestamp=None, n=1):
+        """
+        Create a WarmKey from a key id.
+        :param kid: key id.
+        :param timestamp: timestamp.
+        :param n: number of pressed times.
+        """
+        key = _keys[kid]
+        warm_key = cls.__new__(cls)
+        ColdKey.__init__(warm_key, vk=key.vk, char=key.char)
+        warm_key.timestamp = timestamp
+        warm_key.n = n
+        return warm_key
+
     def to_cold_key(self):
         """Return a ColdKey."""
         return ColdKey(vk=self.vk, char=self.char)
@@ -103,13 +242,20 @@ class WarmKey(ColdKey):
             self.__n = 1
 
 
+KeyEvent = namedtuple('KeyEvent', 'key pressed timestamp suppressed')
+KeyEvent.__doc__ = """A key event seen by the keyboard listener."""
+
+
 class Function:
-    """Store a function with its parameters, you can call it later"""
+    """Store a function with its parameters, you can call it later.
+
+    A coroutine function is scheduled on its event loop "loop" instead."""
 
     def __init__(self, function=None, *args, **kwargs):
         self.__func = None
         self.__args = None
         self.__kwargs = None
+        self.loop = None
         if not self.set(function, *args, **kwargs):
             raise TypeError("'func' must be a callable object or None")
 
@@ -118,13 +264,37 @@ class Function:
         If 'args' and 'kwargs' are None, the stored parameters will be used instead."""
         if None is self.__func:
             return None
-        return self.__func(*args, **kwargs) if args or kwargs \
+        r = self.__func(*args, **kwargs) if args or kwargs \
             else self.__func(*self.__args, **self.__kwargs)
+        if isinstance(r, CoroutineType):
+            if None is self.loop:
+                r.close()
+                raise RuntimeError('no event loop to run the coroutine function')
+            self.loop.call_soon_threadsafe(self.loop.create_task, r)
+            return None
+        return r
+
+    @property
+    def func(self):
+        return self.__func
+
+    @property
+    def args(self):
+        return self.__args
+
+    @property
+    def kwargs(self):
+        return self.__kwargs
 
     @property
     def callable(self):
         return None is not self.__func
 
+    @property
+    def coroutine(self):
+        from inspect import iscoroutinefunction
+        return iscoroutinefunction(self.__func)
+
     def set(self, func=None, *args, **kwargs):
         """Set function and its parameters, or use 'None' to clear the old function"""
         if None is func:
@@ -143,22 +313,51 @@ class Function:
 class HotKey:
     def __init__(self, keys, count, func, *args, **kwargs):
         self.keys = keys
+        self.key_set = key_set(keys)
         self.count = count if 1 == len(keys) else None
         self.func = Function(func, *args, **kwargs)
+        # A disabled hotkey stays registered but is never triggered
+        self.enabled = True
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            length = len(self.keys)
-            if length == len(other.keys) and all((k in other.keys for k in self.keys)):
-                if 1 == length and self.count != other.count:
-                    return False
-                return True
+            return self.key_set == other.key_set and self.count == other.count
         return False
 
+    def __hash__(self):
+        return hash((self.key_set, self.count))
+
     def __repr__(self):
+        disabled = '' if self.enabled else ' disabled'
         if 1 == len(self.keys):
-            return '<HotKey key={} count={}>'.format(self.keys[0], self.count)
-        return '<HotKey keys=({})>'.format(', '.join([repr(k) for k in self.keys]))
+            return '<HotKey key={} count={}{}>'.format(self.keys[0], self.count, disabled)
+        return '<HotKey keys=({}){}>'.format(', '.join([repr(k) for k in self.keys]), disabled)
+
+    def __call__(self):
+        return self.func()
+
+
+class Sequence:
+    """A hotkey made of several steps, each step is a key combination, eg: ctrl+k then ctrl+c."""
+
+    def __init__(self, steps, timeout, func, *args, **kwargs):
+        """
+        :param steps: ColdKey lists.
+        :param timeout: max seconds between two steps.
+        """
+        self.steps = steps
+        self.key_sets = tuple(key_set(keys) for keys in steps)
+        self.timeout = timeout
+        self.func = Function(func, *args, **kwargs)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self.key_sets == other.key_sets
+        return False
+
+    def __repr__(self):
+        steps = ['+'.join([repr(k) for k in keys]) for keys in self.steps]
+        return '<Sequence steps=({})>'.format(', '.join(steps))
 
     def __call__(self):
         return self.func()
@@ -171,22 +370,28 @@ class MagicKey:
     - Bind 2 functions for pressed and released event.
     """
 
-    def __init__(self, cold_key):
+    def __init__(self, cold_key, other=None):
+        """
+        :param cold_key: the key.
+        :param other: a MagicKey whose functions are shared, None means no functions.
+        """
         self.key = cold_key
-        self.func_on_press = Function()
-        self.func_on_release = Function()
+        self.func_on_press = other.func_on_press if other else Function()
+        self.func_on_release = other.func_on_release if other else Function()
+
+    # The functions are replaced, not modified: they may be shared with another MagicKey
 
     def set_func_on_press(self, func, *args, **kwargs):
-        self.func_on_press.set(func, *args, **kwargs)
+        self.func_on_press = Function(func, *args, **kwargs)
 
     def set_func_on_release(self, func, *args, **kwargs):
-        self.func_on_release.set(func, *args, **kwargs)
+        self.func_on_release = Function(func, *args, **kwargs)
 
     def remove_func_on_press(self):
-        self.func_on_press.func = None
+        self.func_on_press = Function()
 
     def remove_func_on_release(self):
-        self.func_on_release.func = None
+        self.func_on_release = Function()
 
     @property
     def on_press(self):
@@ -211,6 +416,7 @@ def to_cold_keys(keys):
     :rtype: list.
     """
     new_keys = []
+    ids = set()
     if keys and isinstance(keys, (list, tuple)):
         for key in keys:
             if not key:
@@ -218,6 +424,49 @@ def to_cold_keys(keys):
             k = ColdKey.from_object(key)
             if k is None:
                 continue
-            if k not in new_keys:
+            if k.id not in ids:
+                ids.add(k.id)
                 new_keys.append(k)
     return new_keys
+
+
+def key_set(keys):
+    """
+    Return the key ids of a key list, which can be used as a dict key.
+    :param keys: ColdKey list or WarmKey list.
+    :rtype: frozenset.
+    """
+    return frozenset([k.id for k in keys])
+
+
+class Modifier(IntFlag):
+    """Bits of the modifier mask, see "keyboard.modifiers"."""
+    SHIFT = 1
+    CTRL = 2
+    ALT = 4
+    ALT_GR = 8
+    CMD = 16
+
+
+# Key id of a modifier key -> modifier bit
+MODIFIER_BITS = {key_id(getattr(Key, name)): int(bit) for names, bit in (
+    (('shift', 'shift_l', 'shift_r'), Modifier.SHIFT),
+    (('ctrl', 'ctrl_l', 'ctrl_r'), Modifier.CTRL),
+    (('alt', 'alt_l', 'alt_r'), Modifier.ALT),
+    (('alt_gr',), Modifier.ALT_GR),
+    (('cmd', 'cmd_l', 'cmd_r'), Modifier.CMD)) for name in names if hasattr(Key, name)}
+
+
+def modifier_mask(flags):
+    """
+    Return the modifier mask of the pressed keys.
+    :param flags: a bytearray indexed by key id, pressed keys are flagged with 1.
+    :rtype: int.
+    """
+    mask = 0
+    length = len(flags)
+    for kid, bit in MODIFIER_BITS.items():
+        if kid < length and flags[kid]:
+            mask |= bit
+    return mask
+
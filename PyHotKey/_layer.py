@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Hotkey layers.
+"""
+from threading import Lock
+from ._index import HotKeyIndex
+from ._keys import ColdKey, Function, HotKey, MagicKey, to_cold_keys
+from ._aio import running_loop
+
+
+class Layer:
+    """
+    A named set of hotkeys and magickeys, with its own index.
+
+    Layers are created by "keyboard.create_layer" and have the registration
+    apis of the keyboard. The hotkeys and magickeys of a layer work while the
+    layer is active: activating or deactivating a layer doesn't register
+    anything again.
+
+    The hotkey index and the magickey dict are published as snapshots: a
+    writer builds the next snapshot under the layer's lock and swaps it in,
+    the listener thread reads "_hotkeys" and "_magickeys" without any lock.
+    Published snapshots are never modified. The hotkeys by id are only read by
+    the writers, they are kept in a dict modified under the lock.
+    """
+
+    def __init__(self, name, priority, ids, logger, loop, on_register=None):
+        """
+        :param name: name of the layer.
+        :param priority: layers with higher priority are matched first.
+        :param ids: iterator of the hotkey ids, shared by the layers.
+        :param logger: function returning the logger.
+        :param loop: function returning the event loop of the coroutine functions, or None.
+        :param on_register: function called after a registration.
+        """
+        self.__name = name
+        self.__priority = priority
+        self.__ids = ids
+        self.__get_logger = logger
+        self.__get_loop = loop
+        self.__on_register = on_register
+        self.__lock = Lock()
+        self._hotkeys = HotKeyIndex()
+        self._magickeys = {}
+        # Hotkey id -> hotkey, in registration order
+        self.__hotkeys = {}
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def priority(self):
+        return self.__priority
+
+    @property
+    def hotkeys(self):
+        return list(self.__hotkeys.values())
+
+    @property
+    def magickeys(self):
+        return list(self._magickeys.values())
+
+    def __repr__(self):
+        return '<Layer name={} priority={} hotkeys={} magickeys={}>'.format(
+            self.__name, self.__priority, len(self.__hotkeys), len(self._magickeys))
+
+    def __registered(self):
+        if self.__on_register:
+            self.__on_register()
+
+    def __new_hotkey(self, keys, count, func, args, kwargs):
+        """Return a new HotKey, or None if the parameters are invalid."""
+        logger = self.__get_logger()
+        if not callable(func):
+            logger.info('【Register hotkey 0】"func" is not callable')
+            return None
+        keys_new = to_cold_keys(keys)
+        length = len(keys_new)
+        if 0 == length:
+            logger.info('【Register hotkey 0】invalid key list: {}'.format(keys))
+            return None
+        if 1 == length and (not isinstance(count, int) or 2 > count):
+            logger.info('【Register hotkey 0】invalid "count", "count" must >= 2')
+            return None
+        hotkey_new = HotKey(keys_new, count, func, *args, **kwargs)
+        if hotkey_new.func.coroutine:
+            hotkey_new.func.loop = self.__get_loop() or running_loop()
+            if None is hotkey_new.func.loop:
+                logger.info('【Register hotkey 0】no event loop for the coroutine function')
+                return None
+        return hotkey_new
+
+    def register_hotkey(self, keys, count, func, *args, **kwargs):
+        """
+        :param keys: a key list, eg: [Key.ctrl_l, Key.alt_l, "z"].
+        :param count: tap a single key "count" times to trigger the hotkey (must >= 2).
+        :param func: the function invoked when the hotkey is triggered.
+        :param args: the arguments of "func".
+        :param kwargs: the keyword arguments of "func".
+        :return:
+                0 -> invalid parameters;
+                -1 -> the hotkey has been registered;
+                positive integer -> hotkey id;
+        """
+        hotkey_new = self.__new_hotkey(keys, count, func, args, kwargs)
+        if None is hotkey_new:
+            return 0
+        result = self.__publish_hotkeys([hotkey_new])[0]
+        if 0 < result:
+            self.__get_logger().info('【Register hotkey 1】{}'.format(hotkey_new))
+        return result
+
+    def __publish_hotkeys(self, hotkeys):
+        """
+        Give ids to new hotkeys and publish them in the next index snapshot.
+        :param hotkeys: HotKey list, None for the invalid ones.
+        :return: a list with the result of "register_hotkey" for each hotkey.
+        """
+        logger = self.__get_logger()
+        results = []
+        added = {}
+        with self.__lock:
+            index = self._hotkeys
+            # An empty layer has nothing to look for in its index
+            find = index.find if self.__hotkeys else None
+            for hotkey_new in hotkeys:
+                if None is hotkey_new:
+                    results.append(0)
+                elif hotkey_new in added or find and find(hotkey_new):
+                    logger.info('【Register hotkey -1】hotkey: {} has been registered'.format(hotkey_new.keys))
+                    results.append(-1)
+                else:
+                    hotkey_new.id = next(self.__ids)
+                    added[hotkey_new] = hotkey_new
+                    results.append(hotkey_new.id)
+            if added:
+                self._hotkeys = index.with_hotkeys(list(added))
+                self.__hotkeys.update([(hotkey.id, hotkey) for hotkey in added])
+        if added:
+            self.__registered()
+        return results
+
+    def register_hotkeys(self, entries):
+        """
+        Register several hotkeys at once, the index is built once for all of them.
+        :param entries: iterable of (keys, count, func), (keys, count, func, args)
+            or (keys, count, func, args, kwargs) tuples, like the parameters of "register_hotkey".
+        :return: a list with the result of "register_hotkey" for each entry:
+                0 -> invalid parameters;
+                -1 -> the hotkey has been registered, or is repeated in "entries";
+                positive integer -> hotkey id;
+        """
+        logger = self.__get_logger()
+        hotkeys = []
+        for entry in entries:
+            if isinstance(entry, (list, tuple)) and 3 <= len(entry) <= 5:
+                keys, count, func, args, kwargs = (tuple(entry) + ((), {}))[:5]
+                hotkeys.append(self.__new_hotkey(keys, count, func, args or (), kwargs or {}))
+            else:
+                logger.info('【Register hotkey 0】invalid entry: {}'.format(entry))
+                hotkeys.append(None)
+        results = self.__publish_hotkeys(hotkeys)
+        added = [r for r in results if 0 < r]
+        if added:
+            logger.info('【Register hotkeys {}】{} entries'.format(len(added), len(results)))
+        return results
+
+    def unregister_hotkey_by_id(self, id_):
+        """
+        :param id_: the id of the hotkey to be unregistered.
+        :rtype: bool.
+        """
+        if isinstance(id_, int) and 0 < id_:
+            with self.__lock:
+                hotkey = self.__hotkeys.pop(id_, None)
+                if hotkey:
+                    self._hotkeys = self._hotkeys.without_hotkey(hotkey)
+                    self.__get_logger().info('【Unregister hotkey 1】{}'.format(hotkey))
+                    return True
+        self.__get_logger().info("【Unregister hotkey 0】hotkey id: {} doesn't exist".format(id_))
+        return False
+
+    def unregister_hotkey_by_keys(self, keys, count=2):
+        """
+        :param keys: the key list to be unregistered.
+        :param count: the target hotkey's count (for hotkey with single keystroke).
+        :rtype: bool.
+        """
+        logger = self.__get_logger()
+        keys_new = to_cold_keys(keys)
+        length = len(keys_new)
+        if 0 == length:
+            logger.info('【Unregister hotkey 0】invalid key list: {}'.format(keys))
+            return False
+        if 1 == length and (not isinstance(count, int) or 2 > count):
+            logger.info('【Unregister hotkey 0】invalid "count", "count" must > 1')
+            return False
+        with self.__lock:
+            hotkey = self._hotkeys.find(HotKey(keys_new, count, None))
+            if hotkey:
+                self._hotkeys = self._hotkeys.without_hotkey(hotkey)
+                del self.__hotkeys[hotkey.id]
+                logger.info('【Unregister hotkey 1】{}'.format(hotkey))
+                return True
+        logger.info("【Unregister hotkey 0】hotkey: {} doesn't exists".format(keys_new))
+        return False
+
+    def load_keymap(self, path, cache_dir=None):
+        """
+        Register the hotkeys of a JSON or TOML keymap file.
+        :param path: path of the keymap.
+        :param cache_dir: directory of the keymap caches, None means no cache.
+        :return: the result of "register_hotkeys" for the hotkeys of the keymap.
+        """
+        from ._keymap import load_keymap
+        entries = load_keymap(path, cache_dir)
+        logger = self.__get_logger()
+        # The keys of a keymap are valid ColdKeys without duplicates, the hotkeys are built directly
+        loops = {}
+        hotkeys = []
+        for keys, count, func, args, kwargs in entries:
+            hotkey_new = HotKey(keys, count, func, *args, **kwargs)
+            if func not in loops:
+                loops[func] = self.__get_loop() or running_loop() if hotkey_new.func.coroutine else False
+            if None is loops[func]:
+                logger.info('【Register hotkey 0】no event loop for the coroutine function')
+                hotkey_new = None
+            else:
+                hotkey_new.func.loop = loops[func] or None
+            hotkeys.append(hotkey_new)
+        results = self.__publish_hotkeys(hotkeys)
+        added = [r for r in results if 0 < r]
+        if added:
+            logger.info('【Register hotkeys {}】{} entries'.format(len(added), len(results)))
+        return results
+
+    def save_keymap(self, path):
+        """
+        Write the hotkeys in a JSON or TOML keymap file (".toml" for TOML).
+        The functions of the hotkeys must be importable, eg: no lambda.
+        :param path: path of the keymap.
+        """
+        from ._keymap import save_keymap
+        save_keymap(path, self.hotkeys)
+
+    def unregister_hotkeys(self, items):
+        """
+        Unregister several hotkeys at once, the index is built once for all of them.
+        :param items: iterable of hotkey ids, key lists, or (key list, count) pairs.
+        :return: a list of bool, whether each item was unregistered.
+        """
+        logger = self.__get_logger()
+        targets = []
+        for item in items:
+            if isinstance(item, int):
+                targets.append(item)
+                continue
+            keys, count = item, 2
+            if isinstance(item, (list, tuple)) and 2 == len(item) and isinstance(item[0], (list, tuple)):
+                keys, count = item
+            keys_new = to_cold_keys(keys)
+            if 0 == len(keys_new) or 1 == len(keys_new) and (not isinstance(count, int) or 2 > count):
+                logger.info('【Unregister hotkey 0】invalid item: {}'.format(item))
+                targets.append(None)
+            else:
+                targets.append(HotKey(keys_new, count, None))
+        results = []
+        removed = {}
+        with self.__lock:
+            index = self._hotkeys
+            for target in targets:
+                hotkey = self.__hotkeys.get(target) if isinstance(target, int) else target and index.find(target)
+                if hotkey and id(hotkey) not in removed:
+                    removed[id(hotkey)] = hotkey
+                    results.append(True)
+                else:
+                    results.append(False)
+            if removed:
+                self._hotkeys = index.without_hotkeys(list(removed.values()))
+                for hotkey in removed.values():
+                    del self.__hotkeys[hotkey.id]
+        logger.info('【Unregister hotkeys {}】{} items'.format(len(removed), len(results)))
+        return results
+
+    def get_hotkey(self, id_):
+        """
+        :param id_: the hotkey id.
+        :return: the hotkey, or None.
+        """
+        return self.__hotkeys.get(id_)
+
+    def __set_enabled(self, id_, enabled):
+        hotkey = self.__hotkeys.get(id_)
+        if None is hotkey:
+            self.__get_logger().info("【{} hotkey 0】hotkey id: {} doesn't exist".format(
+                'Enable' if enabled else 'Disable', id_))
+            return False
+        hotkey.enabled = enabled
+        self.__get_logger().info('【{} hotkey 1】{}'.format('Enable' if enabled else 'Disable', hotkey))
+        return True
+
+    def enable_hotkey(self, id_):
+        """
+        Enable a hotkey disabled by "disable_hotkey".
+        :param id_: the hotkey id.
+        :rtype: bool.
+        """
+        return self.__set_enabled(id_, True)
+
+    def disable_hotkey(self, id_):
+        """
+        Disable a hotkey without unregistering it: it isn't triggered until "enable_hotkey",
+        the hotkeys of the lower layers can be triggered instead.
+        :param id_: the hotkey id.
+        :rtype: bool.
+        """
+        return self.__set_enabled(id_, False)
+
+    def unregister_all_hotkeys(self):
+        with self.__lock:
+            self._hotkeys = HotKeyIndex()
+            self.__hotkeys = {}
+        self.__get_logger().info("【Unregister all hotkeys】")
+        return True
+
+    def __set_magickey(self, key, on_press, func, *args, **kwargs):
+        logger = self.__get_logger()
+        if not callable(func):
+            logger.info('【Set magickey 0】"func" is not callable')
+            return False
+        key = ColdKey.from_object(key)
+        if key is None:
+            logger.info('【Set magickey 0】invalid key')
+            return False
+        loop = self.__get_loop() or running_loop()
+        if None is loop and Function(func).coroutine:
+            logger.info('【Set magickey 0】no event loop for the coroutine function')
+            return False
+        with self.__lock:
+            magickey = MagicKey(key, self._magickeys.get(key.id))
+            if on_press:
+                magickey.set_func_on_press(func, *args, **kwargs)
+                magickey.func_on_press.loop = loop
+            else:
+                magickey.set_func_on_release(func, *args, **kwargs)
+                magickey.func_on_release.loop = loop
+            self._magickeys = self.__with_magickey(magickey)
+        self.__registered()
+        logger.info('【Set magickey 1】{}'.format(magickey))
+        return True
+
+    def set_magickey_on_press(self, key, func, *args, **kwargs):
+        """
+        Set a magickey for key on_press event.
+        :param key: target key.
+        :param func: the function invoked when "key" is pressed.
+        :param args: the arguments of "func".
+        :param kwargs: the keyword arguments of "func".
+        :rtype: bool.
+        """
+        return self.__set_magickey(key, 1, func, *args, **kwargs)
+
+    def set_magickey_on_release(self, key, func, *args, **kwargs):
+        """
+        Set a magickey for key release event.
+        :param key: target key.
+        :param func: the function invoked when "key" is released.
+        :param args: the arguments of "func".
+        :param kwargs: the keyword arguments of "func".
+        :rtype: bool.
+        """
+        return self.__set_magickey(key, 0, func, *args, **kwargs)
+
+    def __remove_magickey(self, key, on_press=None):
+        logger = self.__get_logger()
+        key = ColdKey.from_object(key)
+        if key is None:
+            logger.info('【Remove magickey 0】invalid key')
+            return False
+        with self.__lock:
+            magickey = self._magickeys.get(key.id)
+            if magickey:
+                if None is on_press:
+                    magickeys = self._magickeys.copy()
+                    magickeys.pop(key.id)
+                    self._magickeys = magickeys
+                    logger.info('【Remove magickey 1】{}'.format(key))
+                elif on_press:
+                    magickey = MagicKey(key, magickey)
+                    magickey.remove_func_on_press()
+                    self._magickeys = self.__with_magickey(magickey)
+                    logger.info('【Remove magickey on on_press】{}'.format(key))
+                else:
+                    magickey = MagicKey(key, magickey)
+                    magickey.remove_func_on_release()
+                    self._magickeys = self.__with_magickey(magickey)
+                    logger.info('【Remove magickey on release】{}'.format(key))
+                return True
+        logger.info('【Remove magickey -1】key: {} is not monitored'.format(key))
+        return False
+
+    def __with_magickey(self, magickey):
+        """Return a copy of the magickey dict with "magickey"."""
+        magickeys = self._magickeys.copy()
+        magickeys[magickey.key.id] = magickey
+        return magickeys
+
+    def remove_magickey(self, key):
+        """
+        Remove a magickey for key on_press and release event.
+        :param key: target key.
+        :rtype: bool.
+        """
+        return self.__remove_magickey(key)
+
+    def remove_magickey_on_press(self, key):
+        """
+        Remove a magickey for key on_press event.
+        :param key: target key.
+        :rtype: bool.
+        """
+        return self.__remove_magickey(key, 1)
+
+    def remove_magickey_on_release(self, key):
+        """
+        Remove a magickey for key release event.
+        :param key: target key.
+        :rtype: bool.
+        """
+        return self.__remove_magickey(key, 0)
+
+    def remove_all_magickeys(self):
+        with self.__lock:
+            self._magickeys = {}
+        self.__get_logger().info('【Remove all magickeys】')
+        return True
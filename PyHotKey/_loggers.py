@@ -57,5 +57,16 @@ def get_classic_logger(name):
     return logger
 
 
+def prepare_default_logger():
+    """Give the default logger its handler, on the first call: when the logger is first used."""
+    global _default_logger_ready
+    if not _default_logger_ready:
+        _default_logger_ready = True
+        get_classic_logger(NAME)
+    return default_logger
+
+
 dummy_logger = DummyLogger()
-default_logger = get_classic_logger(NAME)
+# The handler is added by "prepare_default_logger"
+default_logger = getLogger(NAME)
+_default_logger_ready = False
@@ -17,16 +17,85 @@
 """
 Platform stuff.
 """
+from os import environ
 from sys import platform
+from importlib import import_module
 
-if 'win32' == platform:
-    from .win32 import Key, KeyCode, Controller, Listener, pre_process_key, filter_name, event_filter
-elif 'darwin' == platform:
-    from .darwin import Key, KeyCode, Controller, Listener, pre_process_key, filter_name, event_filter
-else:
+# The built-in backends
+BACKENDS = ('win32', 'darwin', 'xorg', 'uinput', 'synthetic')
+# Backend name -> module, or import path of the module
+_backends = {name: '.' + name for name in BACKENDS}
+
+
+def default_backend():
+    """The backend named by the "PYHOTKEY_BACKEND" environment variable, or the one of the platform."""
+    name = environ.get('PYHOTKEY_BACKEND')
+    if name:
+        return name
+    if 'win32' == platform:
+        return 'win32'
+    if 'darwin' == platform:
+        return 'darwin'
+    return 'xorg'
+
+
+def register_backend(name, backend):
+    """
+    Register a backend, it can then be selected by name like the built-in ones:
+    by "HotKeyboard(backend=name)" or the "PYHOTKEY_BACKEND" environment variable.
+
+    :param name: name of the backend, a built-in backend can be replaced.
+    :param backend: a module (or any object) with the attributes of a backend,
+        see "load_backend", or its import path, eg: "my_package.my_backend".
+    """
+    _backends[name] = backend
+
+
+def load_backend(backend=None):
+    """
+    Import a backend module.
+
+    :param backend: a registered name (see "BACKENDS" and "register_backend"), a backend
+        module, or None for "default_backend()".
+    :return: the module, with Key, KeyCode, Controller, Listener, pre_process_key,
+        filter_name, event_filter and update_layout.
+    """
+    if None is backend or isinstance(backend, str):
+        name = backend or default_backend()
+        backend = _backends.get(name)
+        if None is backend:
+            raise ImportError('Unsupported backend: {}'.format(name))
+        if isinstance(backend, str):
+            backend = import_module(backend, __name__)
+    if not all([getattr(backend, attr, None) for attr in ('Key', 'KeyCode', 'Controller', 'Listener',
+                                                            'pre_process_key', 'event_filter', 'update_layout')]) \
+            or not hasattr(backend, 'filter_name'):
+        raise ImportError('Unsupported platform')
+    return backend
+
+
+def keys_backend():
+    """
+    Import the backend of the keys shared by all the keyboards: the default one,
+    or the synthetic one if the default one can't be imported (eg: no display)
+    and "PYHOTKEY_BACKEND" is not set.
+    """
     try:
-        from .xorg import Key, KeyCode, Controller, Listener, pre_process_key, filter_name, event_filter
+        return load_backend()
     except ImportError:
-        raise
-if not all([Key, KeyCode, Controller, Listener, pre_process_key, event_filter]):
-    raise ImportError('Unsupported platform')
+        if environ.get('PYHOTKEY_BACKEND'):
+            raise
+        return load_backend('synthetic')
+
+
+def __getattr__(name):
+    # The backend is imported on first use, not with the package
+    if name not in ('backend', 'Key', 'KeyCode', 'Controller', 'Listener', 'pre_process_key', 'filter_name',
+                    'event_filter', 'update_layout'):
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    backend = keys_backend()
+    globals().update(backend=backend, Key=backend.Key, KeyCode=backend.KeyCode, Controller=backend.Controller,
+                     Listener=backend.Listener, pre_process_key=backend.pre_process_key,
+                     filter_name=backend.filter_name, event_filter=backend.event_filter,
+                     update_layout=backend.update_layout)
+    return globals()[name]
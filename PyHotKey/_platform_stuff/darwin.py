@@ -17,6 +17,7 @@
 import Quartz
 from pynput._util.darwin import keycode_context, keycode_to_string
 from pynput.keyboard._darwin import Key, KeyCode, Controller, Listener
+from .translation import TranslationCache
 
 filter_name = 'darwin_intercept'
 kSystemDefinedEventMediaKeysSubtype = 8
@@ -24,9 +25,24 @@ with keycode_context() as context:
     _context = context
 
 
+def _translate(vk):
+    return KeyCode(char=keycode_to_string(_context, vk))
+
+
+_translations = TranslationCache(_translate, lambda: _context)
+
+
+def update_layout():
+    """Reload the keyboard layout."""
+    global _context
+    with keycode_context() as context:
+        _context = context
+    _translations.invalidate()
+
+
 def pre_process_key(key):
     if isinstance(key, KeyCode):
-        return KeyCode(char=keycode_to_string(_context, key.vk))
+        return _translations(key.vk)
     return key
 
 
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Synthetic backend: no OS hook, no display.
+
+Key events are fed to the listener by hand and the controller records the
+events it would have sent, so the whole matching engine can run headless,
+eg: in tests and benchmarks.
+"""
+from os import environ
+from sys import modules
+from enum import Enum
+from threading import Event
+
+if 'pynput' not in modules:
+    # pynput picks a platform backend when imported, which fails without a display
+    environ.setdefault('PYNPUT_BACKEND', 'dummy')
+from pynput.keyboard._base import Key as _Key, KeyCode, Controller as _Controller
+
+filter_name = 'synthetic_event_filter'
+
+# pynput's generic keys all share the same value, give each of them its own virtual key code
+Key = Enum('Key', [(name, KeyCode.from_vk(0xE000 + i)) for i, name in enumerate(_Key.__members__)])
+
+# Modifier key code -> generic modifier, as pynput does for the platform keys
+_MODIFIERS = {Key[name].value: Key[name.partition('_')[0]] for name in (
+    'alt', 'alt_l', 'alt_r', 'cmd', 'cmd_l', 'cmd_r', 'ctrl', 'ctrl_l', 'ctrl_r', 'shift', 'shift_l', 'shift_r')}
+_MODIFIERS[Key.alt_gr.value] = Key.alt_gr
+
+
+class Controller(_Controller):
+    """
+    Record the key events instead of sending them.
+
+    "events" is a list of (KeyCode, pressed).
+    """
+    _Key = Key
+    _KeyCode = KeyCode
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def clear(self):
+        """Forget the recorded events."""
+        self.events = []
+
+    def _as_modifier(self, key):
+        return _MODIFIERS.get(key)
+
+    def _handle(self, key, is_press):
+        self.events.append((key, is_press))
+
+
+class Listener:
+    """
+    Deliver the key events fed by "press", "release" or "feed".
+
+    The events are handled synchronously in the calling thread, and only
+    while the listener is running.
+    """
+
+    def __init__(self, on_press=None, on_release=None, synthetic_event_filter=None, **kwargs):
+        """
+        :param on_press: function called with the pressed key.
+        :param on_release: function called with the released key.
+        :param synthetic_event_filter: function called with (key, pressed), returns whether the event is suppressed.
+        """
+        self.__on_press = on_press
+        self.__on_release = on_release
+        self.__filter = synthetic_event_filter
+        self.__started = Event()
+        self.__running = False
+
+    @property
+    def running(self):
+        return self.__running
+
+    def start(self):
+        self.__running = True
+        self.__started.set()
+
+    def stop(self):
+        self.__running = False
+
+    def wait(self):
+        self.__started.wait()
+
+    def join(self, timeout=None):
+        pass
+
+    def __enter__(self):
+        self.start()
+        self.wait()
+        return self
+
+    def __exit__(self, exc_type, value, traceback):
+        self.stop()
+
+    def feed(self, key, pressed):
+        """
+        Deliver a key event.
+
+        :param key: a Key, a KeyCode or a character.
+        :param pressed: True for a press, False for a release.
+        :return: whether the event is suppressed.
+        """
+        if not self.__running:
+            return False
+        if isinstance(key, str):
+            key = KeyCode.from_char(key)
+        if self.__filter:
+            return bool(self.__filter(key, pressed))
+        callback = self.__on_press if pressed else self.__on_release
+        if callback:
+            callback(key)
+        return False
+
+    def press(self, key):
+        """Deliver a key press, return whether it is suppressed."""
+        return self.feed(key, True)
+
+    def release(self, key):
+        """Deliver a key release, return whether it is suppressed."""
+        return self.feed(key, False)
+
+    def tap(self, key):
+        """Deliver a key press and a key release."""
+        self.feed(key, True)
+        self.feed(key, False)
+
+
+def pre_process_key(key):
+    return key
+
+
+def update_layout():
+    pass
+
+
+def event_filter(self, key, pressed):
+    return self._on_press(key) if pressed else self._on_release(key)
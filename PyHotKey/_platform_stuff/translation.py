@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Translation cache shared by the platforms.
+"""
+
+
+class TranslationCache:
+    """
+    Cache the results of an OS key translation.
+
+    The results are valid for a keyboard layout: the cache is cleared when
+    the layout changes, or when "invalidate" is called. At most "maxsize"
+    results are kept.
+    """
+
+    def __init__(self, translate, layout=None, maxsize=512):
+        """
+        :param translate: function translating a key code (vk or scan code), its results are cached.
+        :param layout: function returning the current layout, None means the layout never changes.
+        :param maxsize: max number of cached results.
+        """
+        self.__translate = translate
+        self.__get_layout = layout
+        self.__layout = layout() if layout else None
+        self.__maxsize = maxsize
+        self.__results = {}
+
+    def __call__(self, code):
+        if self.__get_layout:
+            layout = self.__get_layout()
+            if layout is not self.__layout and layout != self.__layout:
+                self.__results.clear()
+                self.__layout = layout
+        results = self.__results
+        if code in results:
+            return results[code]
+        if self.__maxsize <= len(results):
+            results.clear()
+        r = results[code] = self.__translate(code)
+        return r
+
+    def invalidate(self):
+        """Clear the cached results."""
+        self.__results.clear()
+
+    def __len__(self):
+        return len(self.__results)
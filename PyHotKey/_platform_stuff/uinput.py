@@ -19,9 +19,13 @@ from pynput.keyboard._uinput import Key, KeyCode, Controller, Listener
 filter_name = None
 
 
-def pre_process(key):
+def pre_process_key(key):
     return key
 
 
 def event_filter():
     pass
+
+
+def update_layout():
+    pass
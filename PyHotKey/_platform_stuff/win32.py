@@ -16,16 +16,31 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 from pynput._util.win32 import KeyTranslator
 from pynput.keyboard._win32 import Key, KeyCode, Controller, Listener
+from .translation import TranslationCache
 
 filter_name = 'win32_event_filter'
 translator = KeyTranslator()
 
 
+def _translate(vk):
+    return KeyCode(char=translator.char_from_scan(translator(vk, True).get('_scan')))
+
+
+# The translator keeps its layout until "update_layout" is called
+_translations = TranslationCache(_translate, lambda: translator._layout)
+
+
+def update_layout():
+    """Reload the keyboard layout, must not be called from the keyboard hook."""
+    translator.update_layout()
+    _translations.invalidate()
+
+
 def pre_process_key(key):
     if isinstance(key, KeyCode):
         if key.char and not key.vk:
             return KeyCode(char=key.char.lower())
-        new_key = KeyCode(char=translator.char_from_scan(translator(key.vk, True).get('_scan')))
+        new_key = _translations(key.vk)
         if new_key.char or new_key.vk:
             return new_key
     return key
@@ -28,5 +28,9 @@ def pre_process_key(key):
     return key
 
 
+def update_layout():
+    pass
+
+
 def event_filter():
     pass
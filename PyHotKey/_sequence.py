@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Sequence matching.
+"""
+
+
+from threading import Lock
+
+
+class _Node:
+    __slots__ = ('children', 'sequence', 'timeout')
+
+    def __init__(self, other=None):
+        """:param other: a node to copy, None means an empty node."""
+        # Key id set of the next step -> node
+        self.children = other.children.copy() if other else {}
+        self.sequence = other.sequence if other else None
+        # Max seconds before the next step, the max timeout of the sequences below
+        self.timeout = other.timeout if other else 0
+
+
+class SequenceTrie:
+    """
+    Store the registered sequences in a prefix trie, and follow the key
+    combinations pressed by the user.
+
+    The matching state is a node of the trie: a key down moves it to a child
+    (or triggers the sequence of the child), a mismatch or a timeout moves it
+    back to the root. Key downs of keys used by no sequence are skipped with
+    a set lookup.
+
+    The published trie is never modified: writers build a new one under a
+    lock (copying the nodes on the path of a new sequence) and swap it in, so
+    "advance" reads it without a lock.
+    """
+
+    def __init__(self, modifier_ids=()):
+        """:param modifier_ids: ids of the modifier keys, their key downs don't move the state."""
+        self.__lock = Lock()
+        self.__sequences = ()
+        # (root, ids of the keys used by the sequences)
+        self.__trie = (_Node(), frozenset())
+        self.__modifier_ids = frozenset(modifier_ids)
+        self.__node = self.__trie[0]
+        self.__deadline = 0
+
+    def __len__(self):
+        return len(self.__sequences)
+
+    def __iter__(self):
+        return iter(self.__sequences)
+
+    def find(self, sequence):
+        """Return the registered sequence which equals "sequence", or None."""
+        for s in self.__sequences:
+            if s == sequence:
+                return s
+        return None
+
+    def conflicts(self, sequence):
+        """Return whether "sequence" is a prefix of a registered sequence, or the other way round."""
+        node = self.__trie[0]
+        for key_set in sequence.key_sets:
+            if node.sequence:
+                return True
+            node = node.children.get(key_set)
+            if None is node:
+                return False
+        return True
+
+    def add(self, sequence):
+        """
+        Add a sequence, unless it equals or conflicts with a registered sequence.
+        :rtype: bool.
+        """
+        with self.__lock:
+            if self.find(sequence) or self.conflicts(sequence):
+                return False
+            root, keys = self.__trie
+            self.__trie = self.__insert(_Node(root), set(keys), sequence)
+            self.__sequences += (sequence,)
+        return True
+
+    def remove(self, sequence):
+        """:rtype: bool, False if "sequence" isn't registered."""
+        with self.__lock:
+            if not any(s is sequence for s in self.__sequences):
+                return False
+            self.__publish(tuple([s for s in self.__sequences if s is not sequence]))
+        return True
+
+    def clear(self):
+        with self.__lock:
+            self.__publish(())
+
+    def __insert(self, root, keys, sequence):
+        """Insert a sequence below a copied root, the nodes on its path are copied too."""
+        node = root
+        for key_set in sequence.key_sets:
+            node.timeout = max(node.timeout, sequence.timeout)
+            child = node.children.get(key_set)
+            child = node.children[key_set] = _Node(child)
+            node = child
+            keys.update(key_set - self.__modifier_ids)
+        node.sequence = sequence
+        return root, frozenset(keys)
+
+    def __publish(self, sequences):
+        root, keys = _Node(), set()
+        for sequence in sequences:
+            root, keys = self.__insert(root, set(keys), sequence)
+        self.__trie = (root, frozenset(keys))
+        self.__sequences = sequences
+        self.reset()
+
+    def reset(self):
+        """Move the state back to the root."""
+        self.__node = self.__trie[0]
+        self.__deadline = 0
+
+    def advance(self, kid, key_ids, timestamp):
+        """
+        Follow a key down.
+
+        :param kid: id of the pressed key.
+        :param key_ids: ids of the pressed keys, including "kid".
+        :param timestamp: time of the key down.
+        :return: the completed sequence, or None.
+        """
+        root, keys = self.__trie
+        node = self.__node
+        if node is not root and timestamp > self.__deadline:
+            node = self.__node = root
+        if kid not in keys:
+            if node is not root and kid not in self.__modifier_ids:
+                self.__node = root
+            return None
+        step = frozenset(key_ids)
+        child = node.children.get(step)
+        if None is child and node is not root:
+            # Mismatch, the key down may start another sequence
+            child = root.children.get(step)
+        if None is child:
+            self.__node = root
+            return None
+        if child.sequence:
+            self.__node = root
+            return child.sequence
+        self.__node = child
+        self.__deadline = timestamp + child.timeout
+        return None
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Latency histograms and counters of the keyboard.
+"""
+from time import time
+from threading import Lock
+
+# Durations of 2 ** 40 ns (about 18 minutes) and more share the last bucket
+BUCKETS = 41
+
+
+class Histogram:
+    """
+    Durations in nanoseconds, counted in fixed power-of-two buckets:
+    bucket i counts the durations in [2 ** (i - 1), 2 ** i).
+    """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.buckets[min(ns.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        """Return the upper bound of the bucket holding the "p" percentile, 0 if empty."""
+        if not self.count:
+            return 0
+        rank = p * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(1 << i, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count,
+                'avg_ns': self.total // self.count if self.count else 0,
+                'max_ns': self.max,
+                'p50_ns': self.percentile(.5),
+                'p99_ns': self.percentile(.99),
+                'p999_ns': self.percentile(.999),
+                'buckets': [(1 << i, n) for i, n in enumerate(self.buckets) if n]}
+
+
+class Stats:
+    """
+    Counters and histograms of the keyboard:
+    - verdict: hook entry -> verdict returned to the OS hook, for every event.
+    - match: hook entry -> match decision, for the events triggering a hotkey or a magickey.
+    - queue: match decision -> callback start, the time spent in the dispatcher queue.
+    - callback: callback start -> callback end.
+    """
+
+    def __init__(self):
+        self.since = time()
+        self.presses = 0
+        self.releases = 0
+        self.suppressed = 0
+        self.hotkeys = 0
+        self.magickeys = 0
+        self.dropped = 0
+        self.errors = 0
+        self.verdict = Histogram()
+        self.match = Histogram()
+        self.queue = Histogram()
+        self.callback = Histogram()
+        # The callbacks may run on several dispatcher threads
+        self.callback_lock = Lock()
+
+    def event(self, pressed, suppressed, ns):
+        if pressed:
+            self.presses += 1
+        else:
+            self.releases += 1
+        if suppressed:
+            self.suppressed += 1
+        self.verdict.record(ns)
+
+    def called(self, queued_ns, ns, error):
+        with self.callback_lock:
+            if queued_ns is not None:
+                self.queue.record(queued_ns)
+            self.callback.record(ns)
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        with self.callback_lock:
+            queue, callback, errors = self.queue.snapshot(), self.callback.snapshot(), self.errors
+        return {'since': self.since,
+                'elapsed': time() - self.since,
+                'events': self.presses + self.releases,
+                'presses': self.presses,
+                'releases': self.releases,
+                'suppressed': self.suppressed,
+                'hotkeys': self.hotkeys,
+                'magickeys': self.magickeys,
+                'dropped': self.dropped,
+                'errors': errors,
+                'verdict': self.verdict.snapshot(),
+                'match': self.match.snapshot(),
+                'queue': queue,
+                'callback': callback}
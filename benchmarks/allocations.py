@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: memory allocated per key event.
+
+Use "tracemalloc" to measure the peak memory allocated while handling a
+single key event, and the memory retained after many events. The old event
+handling built a "WarmKey" (and a "ColdKey" copy for lookups) per event, it
+is compared with filling a reused "KeyRecord". The whole "HotKeyboard" event
+handling is measured too.
+
+Usage: python allocations.py [events]
+"""
+from sys import argv, path
+from os import environ
+from os.path import abspath, dirname
+from tracemalloc import start, stop, get_traced_memory, reset_peak
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey import Key
+from time import time
+from PyHotKey._keys import WarmKey, KeyRecord, key_id
+from PyHotKey._keyboard import HotKeyboard
+from PyHotKey._platform_stuff import KeyCode, pre_process_key
+
+STREAM = [(Key.ctrl_l, True), (KeyCode.from_char('z'), True),
+          (KeyCode.from_char('z'), False), (Key.ctrl_l, False),
+          (KeyCode.from_char('a'), True), (KeyCode.from_char('a'), False)]
+
+
+def measure(handle, events):
+    """
+    Return (peak bytes per event, retained bytes per event).
+    :param handle: function handling a (key, pressed) event.
+    :param events: number of events.
+    """
+    # Warm up caches
+    for key, pressed in STREAM:
+        handle(key, pressed)
+    start()
+    peak = 0
+    base = get_traced_memory()[0]
+    for i in range(events):
+        key, pressed = STREAM[i % len(STREAM)]
+        current = get_traced_memory()[0]
+        reset_peak()
+        handle(key, pressed)
+        peak += get_traced_memory()[1] - current
+    retained = get_traced_memory()[0] - base
+    stop()
+    return peak / events, retained / events
+
+
+def main():
+    events = int(argv[1]) if 1 < len(argv) else 10000
+    keyboard = HotKeyboard()
+    keyboard.register_hotkey([Key.ctrl_l, 'z'], None, lambda: None)
+    keyboard.register_hotkey([Key.shift_l], 2, lambda: None)
+
+    r = KeyRecord()
+
+    def warm_key(key, pressed):
+        WarmKey(key).to_cold_key()
+
+    def key_record(key, pressed):
+        r.id = key_id(pre_process_key(key))
+        r.timestamp = time()
+
+    hot_keyboard = keyboard.listener.feed
+
+    print('{:<24}{:>18}{:>18}'.format('', 'peak B/event', 'retained B/event'))
+    for name, handle in (('WarmKey (before)', warm_key), ('KeyRecord', key_record),
+                         ('HotKeyboard', hot_keyboard)):
+        peak, retained = measure(handle, events)
+        print('{:<24}{:>18.1f}{:>18.2f}'.format(name, peak, retained))
+
+
+if __name__ == '__main__':
+    main()
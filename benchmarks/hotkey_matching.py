@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: combination hotkey matching.
+
+Feed a synthetic key stream to the listener of the synthetic backend with
+10, 1k and 10k registered hotkeys, and print the number of events per second.
+
+Usage: python hotkey_matching.py [events]
+"""
+from sys import argv, path
+from random import Random
+from time import perf_counter
+from os import environ
+from os.path import abspath, dirname
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey import Key
+from PyHotKey._keyboard import HotKeyboard
+from PyHotKey._platform_stuff import KeyCode
+
+MODIFIERS = [Key.ctrl_l, Key.alt_l, Key.shift_l, Key.cmd_l]
+CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+POOL = MODIFIERS + list(CHARS)
+
+
+def make_combinations(n, seed=521):
+    """Return "n" distinct key lists with 2 to 4 keys."""
+    rand = Random(seed)
+    seen = set()
+    combinations = []
+    while len(combinations) < n:
+        keys = rand.sample(POOL, rand.randint(2, 4))
+        signature = frozenset(keys)
+        if signature in seen:
+            continue
+        seen.add(signature)
+        combinations.append(keys)
+    return combinations
+
+
+def to_event_key(key):
+    return KeyCode.from_char(key) if isinstance(key, str) else key
+
+
+def make_stream(combinations, n, seed=233):
+    """Return about "n" (key, pressed) events, pressing and releasing random combinations."""
+    rand = Random(seed)
+    stream = []
+    while len(stream) < n:
+        keys = [to_event_key(k) for k in rand.choice(combinations)]
+        stream.extend((k, True) for k in keys)
+        stream.extend((k, False) for k in reversed(keys))
+    return stream
+
+
+def run(hotkey_count, events):
+    keyboard = HotKeyboard()
+    combinations = make_combinations(hotkey_count)
+    for keys in combinations:
+        keyboard.register_hotkey(keys, None, lambda: None)
+    stream = make_stream(combinations, events)
+    feed = keyboard.listener.feed
+    start = perf_counter()
+    for key, pressed in stream:
+        feed(key, pressed)
+    return len(stream) / (perf_counter() - start)
+
+
+def main():
+    events = int(argv[1]) if 1 < len(argv) else 200000
+    for hotkey_count in (10, 1000, 10000):
+        print('{:>6} hotkeys: {:>12,.0f} events/s'.format(hotkey_count, run(hotkey_count, events)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: import time.
+
+Run fresh interpreters and print the median time of:
+- "import PyHotKey", eg: for the key constants only,
+- getting "PyHotKey.keyboard", which creates the default keyboard,
+- the first registration, which starts the listener.
+
+The threads and the heavy modules loaded after "import PyHotKey" are printed too.
+
+Usage: python import_time.py [runs]
+"""
+from sys import argv, executable
+from json import loads
+from os import environ
+from os.path import abspath, dirname
+from statistics import median
+from subprocess import check_output
+
+ROOT = dirname(dirname(abspath(__file__)))
+SCRIPT = '''
+import sys, json, threading
+from time import perf_counter
+sys.path.insert(0, {root!r})
+t0 = perf_counter()
+import PyHotKey
+t1 = perf_counter()
+state = {{'threads': threading.active_count(),
+          'modules': [m for m in ('asyncio', 'inspect', 'PyHotKey._keyboard', 'PyHotKey._journal') if m in sys.modules]}}
+keyboard = PyHotKey.keyboard
+t2 = perf_counter()
+keyboard.register_hotkey([PyHotKey.Key.ctrl_l, 'z'], None, print)
+t3 = perf_counter()
+state.update(times=[t1 - t0, t2 - t1, t3 - t2])
+print(json.dumps(state))
+'''.format(root=ROOT)
+
+
+def main():
+    runs = int(argv[1]) if 1 < len(argv) else 10
+    # Run headless by default, set "PYHOTKEY_BACKEND" to measure another backend
+    env = dict(environ, PYHOTKEY_BACKEND=environ.get('PYHOTKEY_BACKEND', 'synthetic'))
+    results = [loads(check_output([executable, '-c', SCRIPT], env=env)) for _ in range(runs)]
+    for i, name in enumerate(('import PyHotKey', 'PyHotKey.keyboard', 'first registration')):
+        print('{:<20}: {:>8.2f} ms'.format(name, 1000 * median(r['times'][i] for r in results)))
+    print('threads after import: {}'.format(results[0]['threads']))
+    print('modules after import: {}'.format(', '.join(results[0]['modules']) or 'none of the heavy ones'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: loading a keymap file.
+
+Save "n" hotkeys in a JSON and a TOML keymap, then print the median time of
+loading each keymap without cache, and with a warm cache.
+
+Usage: python keymap_load.py [hotkeys]
+"""
+from gc import collect
+from sys import argv, path
+from time import perf_counter
+from os import environ
+from os.path import abspath, dirname, join
+from statistics import median
+from tempfile import TemporaryDirectory
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey._keyboard import HotKeyboard
+from hotkey_matching import make_combinations
+
+
+def nothing():
+    pass
+
+
+def measure(path, cache_dir, runs=5):
+    times = []
+    for _ in range(runs):
+        keyboard = HotKeyboard()
+        collect()
+        start = perf_counter()
+        keyboard.load_keymap(path, cache_dir)
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def main():
+    n = int(argv[1]) if 1 < len(argv) else 5000
+    keyboard = HotKeyboard()
+    keyboard.register_hotkeys([(keys, None, nothing) for keys in make_combinations(n)])
+    print('{} hotkeys'.format(n))
+    with TemporaryDirectory() as directory:
+        cache_dir = join(directory, 'cache')
+        for name in ('keymap.json', 'keymap.toml'):
+            keymap = join(directory, name)
+            keyboard.save_keymap(keymap)
+            cold = measure(keymap, None)
+            # The first load writes the cache
+            measure(keymap, cache_dir, 1)
+            warm = measure(keymap, cache_dir)
+            print('{:<12} no cache: {:>8.1f} ms, warm cache: {:>8.1f} ms'.format(name, cold * 1e3, warm * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: switching between keymaps.
+
+Switch between 3 keymaps of "n" hotkeys, by unregistering all the hotkeys
+and registering the next keymap (one by one, and with "register_hotkeys"),
+and by activating the layer of the next keymap. Print the time per switch.
+
+Usage: python layer_switch.py [hotkeys]
+"""
+from sys import argv, path
+from time import perf_counter
+from os import environ
+from os.path import abspath, dirname
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey._keyboard import HotKeyboard
+from hotkey_matching import make_combinations
+
+NAMES = ('editing', 'presentation', 'gaming')
+
+
+def nothing():
+    pass
+
+
+def main():
+    n = int(argv[1]) if 1 < len(argv) else 500
+    keymaps = [make_combinations(n, seed) for seed in range(len(NAMES))]
+    switches = 30
+
+    keyboard = HotKeyboard()
+    start = perf_counter()
+    for i in range(switches):
+        keyboard.unregister_all_hotkeys()
+        for keys in keymaps[i % len(keymaps)]:
+            keyboard.register_hotkey(keys, None, nothing)
+    reregister = (perf_counter() - start) / switches
+
+    keyboard = HotKeyboard()
+    entries = [[(keys, None, nothing) for keys in keymap] for keymap in keymaps]
+    start = perf_counter()
+    for i in range(switches):
+        keyboard.unregister_all_hotkeys()
+        keyboard.register_hotkeys(entries[i % len(entries)])
+    bulk = (perf_counter() - start) / switches
+
+    keyboard = HotKeyboard()
+    for name, keymap in zip(NAMES, keymaps):
+        layer = keyboard.create_layer(name)
+        for keys in keymap:
+            layer.register_hotkey(keys, None, nothing)
+    start = perf_counter()
+    for i in range(switches):
+        keyboard.activate_layer(NAMES[i % len(NAMES)], exclusive=True)
+    activate = (perf_counter() - start) / switches
+
+    print('{} hotkeys per keymap'.format(n))
+    print('{:<24}: {:>12.1f} us/switch'.format('re-register', reregister * 1e6))
+    print('{:<24}: {:>12.1f} us/switch'.format('register_hotkeys', bulk * 1e6))
+    print('{:<24}: {:>12.1f} us/switch'.format('activate_layer', activate * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: logging overhead on the key event path.
+
+Print the number of events per second with the logger turned off, turned on
+with level INFO (key events are filtered out), and turned on with level DEBUG
+(every key event is formatted). The handlers of the default logger are replaced
+with a NullHandler while running.
+
+Usage: python logging_overhead.py [events]
+"""
+from sys import argv, path
+from time import perf_counter
+from os import environ
+from os.path import abspath, dirname
+from logging import DEBUG, INFO, NullHandler
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey import Key
+from PyHotKey._keyboard import HotKeyboard
+from PyHotKey._platform_stuff import KeyCode
+
+STREAM = [(Key.shift_l, True), (KeyCode.from_char('a'), True),
+          (KeyCode.from_char('a'), False), (Key.shift_l, False),
+          (KeyCode.from_char('b'), True), (KeyCode.from_char('b'), False)]
+
+
+def run(keyboard, events):
+    feed = keyboard.listener.feed
+    start = perf_counter()
+    for i in range(events):
+        key, pressed = STREAM[i % len(STREAM)]
+        feed(key, pressed)
+    return events / (perf_counter() - start)
+
+
+def main():
+    events = int(argv[1]) if 1 < len(argv) else 200000
+    keyboard = HotKeyboard()
+    keyboard.register_hotkey([Key.ctrl_l, 'z'], None, lambda: None)
+    logger = keyboard.logger
+    handlers, level_old = logger.handlers, logger.level
+    logger.handlers = [NullHandler()]
+    try:
+        for name, on, level in (('off', 0, DEBUG), ('on, level INFO', 1, INFO), ('on, level DEBUG', 1, DEBUG)):
+            logger.setLevel(level)
+            keyboard.toggle_logger(on)
+            print('logger {:<16}: {:>12,.0f} events/s'.format(name, run(keyboard, events)))
+    finally:
+        logger.handlers = handlers
+        logger.setLevel(level_old)
+
+
+if __name__ == '__main__':
+    main()
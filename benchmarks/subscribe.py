@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark: key event queues.
+
+Feed "n" key events to the listener of the synthetic backend: without
+subscriber, with a queue never read, and with a queue drained in batches by
+another thread. Print the events per second of the listener, the events read
+and the dropped events.
+
+Usage: python subscribe.py [events]
+"""
+from sys import argv, path
+from time import perf_counter, sleep
+from os import environ
+from os.path import abspath, dirname
+from threading import Thread
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey._keyboard import HotKeyboard
+from hotkey_matching import make_combinations, make_stream
+
+
+def nothing():
+    pass
+
+
+def run(stream, maxsize, batch):
+    keyboard = HotKeyboard()
+    for keys in make_combinations(100):
+        keyboard.register_hotkey(keys, None, nothing)
+    queue = keyboard.subscribe(maxsize) if maxsize else None
+    read = [0]
+
+    def consume():
+        while True:
+            events = queue.drain(batch, timeout=None)
+            if not events:
+                break
+            read[0] += len(events)
+    consumer = Thread(target=consume) if batch else None
+    if consumer:
+        consumer.start()
+    feed = keyboard.listener.feed
+    start = perf_counter()
+    for key, pressed in stream:
+        feed(key, pressed)
+    elapsed = perf_counter() - start
+    if consumer:
+        while len(queue):
+            sleep(0.001)
+        queue.close()
+        consumer.join()
+    return len(stream) / elapsed, read[0], queue.dropped if None is not queue else 0
+
+
+def main():
+    n = int(argv[1]) if 1 < len(argv) else 200000
+    stream = make_stream(make_combinations(100), n)
+    print('{:<28}: {:>12} {:>10} {:>10}'.format('', 'events/s', 'read', 'dropped'))
+    for name, maxsize, batch in (('no subscriber', 0, 0),
+                                 ('queue 1024, no reader', 1024, 0),
+                                 ('queue 65536, batches of 256', 65536, 256),
+                                 ('queue 1024, batches of 64', 1024, 64)):
+        rate, read, dropped = run(stream, maxsize, batch)
+        print('{:<28}: {:>12,.0f} {:>10} {:>10}'.format(name, rate, read, dropped))
+
+
+if __name__ == '__main__':
+    main()
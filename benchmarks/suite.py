@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019-2024 Xpp521
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark suite: the hotkey engine.
+
+Feed synthetic key streams to the synthetic backend's listener, for realistic
+and adversarial keymaps (thousands of bindings or sequences, auto-repeat,
+many tap hotkeys), and measure:
+- throughput: events per second,
+- latency: p50, p99 and p999 of the time spent handling a single event,
+- memory: bytes allocated per registered hotkey and magickey.
+
+The results are written in JSON. With "--compare", the ratios against the
+results of another run (eg: of the previous release) are printed, and
+regressions of more than 10% are marked with "!".
+
+Usage: python suite.py [-n EVENTS] [-o FILE] [--compare FILE] [SCENARIO ...]
+"""
+from gc import collect
+from sys import path, version
+from json import dump, load
+from random import Random
+from platform import platform
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from time import perf_counter, perf_counter_ns
+from tracemalloc import start, stop, get_traced_memory
+from os import environ
+from os.path import abspath, dirname
+
+# Run headless: the key events are fed to the synthetic backend's listener
+environ.setdefault('PYHOTKEY_BACKEND', 'synthetic')
+path.insert(0, dirname(dirname(abspath(__file__))))
+from PyHotKey import Key
+from PyHotKey._info import VERSION
+from PyHotKey._keyboard import HotKeyboard
+from PyHotKey._platform_stuff import KeyCode
+from hotkey_matching import MODIFIERS, CHARS, make_combinations, make_stream, to_event_key
+
+LETTERS = [KeyCode.from_char(c) for c in CHARS]
+F_KEYS = [Key['f{}'.format(i)] for i in range(1, 13)]
+
+
+def nothing(*args):
+    pass
+
+
+def tap(key, times=1):
+    events = []
+    for _ in range(times):
+        events.append((key, True))
+        events.append((key, False))
+    return events
+
+
+def combination(keys):
+    return [(k, True) for k in keys] + [(k, False) for k in reversed(keys)]
+
+
+def setup_typing(keyboard):
+    """A usual keymap: some shortcuts, a few tap hotkeys and magickeys."""
+    rand = Random(1)
+    for keys in make_combinations(40):
+        keyboard.register_hotkey(keys, None, nothing)
+    for key in (Key.shift_l, Key.ctrl_l, Key.alt_l):
+        keyboard.register_hotkey([key], 2, nothing)
+    for key in rand.sample(F_KEYS, 5):
+        keyboard.set_magickey_on_press(key, nothing)
+    return 43, 5
+
+
+def stream_typing(n):
+    """Mostly typing, sometimes a shortcut or a double tap."""
+    rand = Random(2)
+    combinations = make_combinations(40)
+    events = []
+    while len(events) < n:
+        r = rand.random()
+        if .9 > r:
+            events.extend(tap(rand.choice(LETTERS)))
+        elif .97 > r:
+            events.extend(combination([to_event_key(k) for k in rand.choice(combinations)]))
+        else:
+            events.extend(tap(rand.choice(MODIFIERS), 2))
+    return events
+
+
+def setup_bindings(keyboard):
+    """Thousands of combination hotkeys."""
+    for keys in make_combinations(5000):
+        keyboard.register_hotkey(keys, None, nothing)
+    return 5000, 0
+
+
+def stream_bindings(n):
+    return make_stream(make_combinations(5000), n)
+
+
+def setup_auto_repeat(keyboard):
+    """Shortcuts, while keys are held down and repeated by the OS."""
+    for keys in make_combinations(1000):
+        keyboard.register_hotkey(keys, None, nothing)
+    return 1000, 0
+
+
+def stream_auto_repeat(n):
+    """Hold some modifiers and a key, the key is pressed again 50 times before the release."""
+    rand = Random(3)
+    events = []
+    while len(events) < n:
+        modifiers = rand.sample(MODIFIERS, rand.randint(0, 2))
+        key = rand.choice(LETTERS)
+        events.extend((m, True) for m in modifiers)
+        events.extend((key, True) for _ in range(50))
+        events.append((key, False))
+        events.extend((m, False) for m in reversed(modifiers))
+    return events
+
+
+def setup_taps(keyboard):
+    """Tap hotkeys on every key, tapped 2 to 5 times."""
+    for key in MODIFIERS + list(CHARS):
+        for count in range(2, 6):
+            keyboard.register_hotkey([key], count, nothing)
+    return 4 * (len(MODIFIERS) + len(CHARS)), 0
+
+
+def stream_taps(n):
+    rand = Random(4)
+    keys = MODIFIERS + LETTERS
+    events = []
+    while len(events) < n:
+        events.extend(tap(rand.choice(keys), rand.randint(1, 6)))
+    return events
+
+
+def setup_magickeys(keyboard):
+    """Magickeys on press and on release of every key."""
+    for key in MODIFIERS + list(CHARS):
+        keyboard.set_magickey_on_press(key, nothing)
+        keyboard.set_magickey_on_release(key, nothing)
+    return 0, len(MODIFIERS) + len(CHARS)
+
+
+def stream_magickeys(n):
+    rand = Random(5)
+    keys = MODIFIERS + LETTERS
+    events = []
+    while len(events) < n:
+        events.extend(tap(rand.choice(keys)))
+    return events
+
+
+def make_sequences(n, seed=6):
+    """Return "n" distinct sequences of 3 steps, like ctrl+k, ctrl+c, x."""
+    rand = Random(seed)
+    seen = set()
+    sequences = []
+    while len(sequences) < n:
+        steps = ((Key.ctrl_l, rand.choice(CHARS)), (Key.ctrl_l, rand.choice(CHARS)), (rand.choice(CHARS),))
+        if steps not in seen:
+            seen.add(steps)
+            sequences.append([list(step) for step in steps])
+    return sequences
+
+
+def setup_sequences(keyboard):
+    """Thousands of sequences, while the user mostly types."""
+    for steps in make_sequences(3000):
+        keyboard.register_sequence(steps, 1, nothing)
+    return 3000, 0
+
+
+def stream_sequences(n):
+    """Typing, sometimes a whole sequence."""
+    rand = Random(7)
+    sequences = make_sequences(3000)
+    events = []
+    while len(events) < n:
+        if .95 > rand.random():
+            events.extend(tap(rand.choice(LETTERS)))
+        else:
+            for step in rand.choice(sequences):
+                events.extend(combination([to_event_key(k) for k in step]))
+    return events
+
+
+SCENARIOS = {
+    'typing': (setup_typing, stream_typing),
+    'bindings': (setup_bindings, stream_bindings),
+    'auto_repeat': (setup_auto_repeat, stream_auto_repeat),
+    'taps': (setup_taps, stream_taps),
+    'magickeys': (setup_magickeys, stream_magickeys),
+    'sequences': (setup_sequences, stream_sequences),
+}
+
+
+def percentile(values, p):
+    """:param values: sorted values."""
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def run_scenario(setup, make_events, n):
+    keyboard = HotKeyboard()
+    hotkeys, magickeys = setup(keyboard)
+    events = make_events(n)
+    feed = keyboard.listener.feed
+    collect()
+    start_time = perf_counter()
+    for key, pressed in events:
+        feed(key, pressed)
+    throughput = len(events) / (perf_counter() - start_time)
+    latencies = []
+    append = latencies.append
+    collect()
+    for key, pressed in events:
+        t = perf_counter_ns()
+        feed(key, pressed)
+        append(perf_counter_ns() - t)
+    latencies.sort()
+    keyboard.stop_listener()
+    return {
+        'hotkeys': hotkeys,
+        'magickeys': magickeys,
+        'events': len(events),
+        'events_per_second': round(throughput),
+        'latency_ns': {'p50': percentile(latencies, .5), 'p99': percentile(latencies, .99),
+                       'p999': percentile(latencies, .999), 'max': latencies[-1]}
+    }
+
+
+def measure_memory(register, n=1000):
+    """Return the bytes allocated per registration."""
+    keyboard = HotKeyboard()
+    keyboard.stop_listener()
+    collect()
+    start()
+    before = get_traced_memory()[0]
+    register(keyboard, n)
+    after = get_traced_memory()[0]
+    stop()
+    return round((after - before) / n, 1)
+
+
+def register_combinations(keyboard, n):
+    for keys in make_combinations(n):
+        keyboard.register_hotkey(keys, None, nothing)
+
+
+def register_taps(keyboard, n):
+    keys = MODIFIERS + list(CHARS)
+    for i in range(n):
+        keyboard.register_hotkey([keys[i % len(keys)]], 2 + i // len(keys), nothing)
+
+
+def register_magickeys(keyboard, n):
+    for i in range(n):
+        keyboard.set_magickey_on_press(KeyCode.from_vk(0x1000 + i), nothing)
+
+
+def compare(results, old):
+    print('\nCompared with {} ({}):'.format(old.get('version'), old.get('time')))
+    for name, result in results['scenarios'].items():
+        previous = old.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        ratios = [('events/s', result['events_per_second'] / previous['events_per_second'], True)]
+        for p in ('p50', 'p99', 'p999'):
+            ratios.append((p, result['latency_ns'][p] / max(1, previous['latency_ns'][p]), False))
+        print('{:<12}'.format(name) + ''.join('{:>10} {:.2f}{:<2}'.format(
+            label, ratio, '!' if (ratio < .9 if higher_better else ratio > 1.1) else '')
+            for label, ratio, higher_better in ratios))
+    for name, size in results['memory'].items():
+        previous = old.get('memory', {}).get(name)
+        if previous:
+            ratio = size / previous
+            print('{:<12}{:>10} {:.2f}{}'.format(name, 'B', ratio, '!' if 1.1 < ratio else ''))
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark suite of the hotkey engine.')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help='scenarios to run: {}, all by default'.format(', '.join(SCENARIOS)))
+    parser.add_argument('-n', '--events', type=int, default=200000, help='events per scenario')
+    parser.add_argument('-o', '--output', default='suite-{}.json'.format(VERSION), help='result file')
+    parser.add_argument('--compare', metavar='FILE', help='result file of a previous run')
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error('unknown scenarios: {}'.format(', '.join(unknown)))
+    results = {
+        'version': VERSION,
+        'python': version.split()[0],
+        'platform': platform(),
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'scenarios': {},
+        'memory': {}
+    }
+    print('{:<12}{:>8}{:>10}{:>14}{:>10}{:>10}{:>10}'.format(
+        'scenario', 'hotkeys', 'magickeys', 'events/s', 'p50 ns', 'p99 ns', 'p999 ns'))
+    for name in args.scenarios or SCENARIOS:
+        setup, make_events = SCENARIOS[name]
+        result = run_scenario(setup, make_events, args.events)
+        results['scenarios'][name] = result
+        latency = result['latency_ns']
+        print('{:<12}{:>8}{:>10}{:>14,}{:>10}{:>10}{:>10}'.format(
+            name, result['hotkeys'], result['magickeys'], result['events_per_second'],
+            latency['p50'], latency['p99'], latency['p999']))
+    for name, register in (('hotkey', register_combinations), ('tap_hotkey', register_taps),
+                           ('magickey', register_magickeys)):
+        results['memory'][name] = measure_memory(register)
+    print('\nBytes per registration: ' + ', '.join('{} {}'.format(k, v) for k, v in results['memory'].items()))
+    with open(args.output, 'w') as f:
+        dump(results, f, indent=2)
+    print('Results written to {}'.format(args.output))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -61,6 +61,8 @@ setup(
     keywords=['hotkey', 'keyboard', 'hot+key'],
     packages=find_packages(),
     # package_dir={'': join(ROOT, MAIN_PACKAGE_NAME)},
+    # Module "__getattr__" (PEP 562) and "asyncio.get_running_loop"
+    python_requires='>=3.7',
     install_requires=INSTALL_REQUIRES,
     setup_requires=SETUP_REQUIRES,
     extras_require=EXTRAS_REQUIRES,
@@ -75,9 +77,6 @@ setup(
         'Intended Audience :: Developers',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
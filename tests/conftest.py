@@ -0,0 +1,3 @@
+from sys import path
+from os.path import dirname, abspath
+path.insert(0, dirname(dirname(abspath(__file__))))
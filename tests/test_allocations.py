@@ -0,0 +1,48 @@
+"""
+Memory allocated by the key event handling, measured with tracemalloc.
+
+Run: python -m pytest tests
+"""
+from tracemalloc import start, stop, get_traced_memory, reset_peak
+from PyHotKey import Key
+from PyHotKey._keyboard import HotKeyboard
+from PyHotKey._platform_stuff.synthetic import KeyCode
+
+STREAM = [(Key.ctrl_l, True), (KeyCode.from_char('z'), True),
+          (KeyCode.from_char('z'), False), (Key.ctrl_l, False),
+          (KeyCode.from_char('a'), True), (KeyCode.from_char('a'), False),
+          (Key.shift_l, True), (Key.shift_l, False)]
+EVENTS = 3000
+# A WarmKey per event took about 480 bytes, the reused KeyRecord about 130
+MAX_PEAK_PER_EVENT = 256
+MAX_RETAINED_PER_EVENT = 1
+
+
+def nothing():
+    pass
+
+
+def test_bytes_per_event():
+    keyboard = HotKeyboard(backend='synthetic')
+    keyboard.register_hotkey([Key.ctrl_l, 'z'], None, nothing)
+    keyboard.register_hotkey([Key.shift_l], 2, nothing)
+    assert keyboard.listener_running
+    feed = keyboard.listener.feed
+    # Warm up the caches
+    for key, pressed in STREAM * 2:
+        feed(key, pressed)
+    start()
+    try:
+        peak = 0
+        base = get_traced_memory()[0]
+        for i in range(EVENTS):
+            key, pressed = STREAM[i % len(STREAM)]
+            current = get_traced_memory()[0]
+            reset_peak()
+            feed(key, pressed)
+            peak += get_traced_memory()[1] - current
+        retained = get_traced_memory()[0] - base
+    finally:
+        stop()
+    assert MAX_PEAK_PER_EVENT > peak / EVENTS
+    assert MAX_RETAINED_PER_EVENT > retained / EVENTS
@@ -0,0 +1,25 @@
+"""
+Behaviour of the callback dispatcher.
+
+Run: python -m pytest tests
+"""
+from threading import Event
+from PyHotKey._dispatch import Dispatcher
+
+
+def fail():
+    raise RuntimeError('failed')
+
+
+def test_worker_survives_exceptions():
+    dispatcher = Dispatcher(1, 8)
+    done = Event()
+    assert dispatcher.submit(fail)
+    assert dispatcher.submit(fail)
+    assert dispatcher.submit(done.set)
+    # The only worker is still alive after two exceptions
+    assert done.wait(5)
+    dispatcher.stop()
+    stats = dispatcher.stats
+    assert 2 == stats['errors']
+    assert 2 <= stats['completed']
@@ -0,0 +1,46 @@
+"""
+Behaviour of the hotkey index and the layers' registration apis.
+
+Run: python -m pytest tests
+"""
+from PyHotKey import Key
+from PyHotKey._index import HotKeyIndex
+from PyHotKey._keys import HotKey, to_cold_keys, key_set
+from PyHotKey._keyboard import HotKeyboard
+
+
+def new_hotkey(keys, count=None):
+    return HotKey(to_cold_keys(keys), count, print)
+
+
+def test_snapshots_are_immutable():
+    a = new_hotkey([Key.ctrl_l, 'a'])
+    b = new_hotkey([Key.ctrl_l, 'b'])
+    tap = new_hotkey(['c'], 2)
+    empty = HotKeyIndex()
+    index = empty.with_hotkeys([a, b, tap])
+    assert a is index.match_combination(a.key_set)
+    assert tap is index.match_tap(tap.keys[0].id, 2) and index.has_taps(tap.keys[0].id)
+    smaller = index.without_hotkeys([a, tap])
+    assert None is smaller.match_combination(a.key_set) and b is smaller.find(b)
+    assert not smaller.has_taps(tap.keys[0].id)
+    # The previous snapshots are unchanged
+    assert a is index.find(a) and tap is index.find(tap)
+    assert None is empty.find(a)
+    assert None is index.match_combination(key_set(to_cold_keys([Key.ctrl_l])))
+
+
+def test_register_unregister_many():
+    keyboard = HotKeyboard(backend='synthetic')
+    entries = [([Key.ctrl_l, chr(0x4e00 + i % 50), chr(0x5e00 + i // 50)], None, print) for i in range(1000)]
+    ids = keyboard.register_hotkeys(entries)
+    assert all(0 < id_ for id_ in ids)
+    assert [-1] == keyboard.register_hotkeys(entries[:1])
+    assert 1000 == len(keyboard.hotkeys)
+    for id_ in ids[::2]:
+        assert keyboard.unregister_hotkey_by_id(id_)
+    assert None is keyboard.get_hotkey(ids[0]) and ids[1] == keyboard.get_hotkey(ids[1]).id
+    assert [False, True] == keyboard.unregister_hotkeys([ids[0], entries[1][0]])
+    assert 499 == len(keyboard.hotkeys)
+    keyboard.unregister_all_hotkeys()
+    assert not keyboard.hotkeys and None is keyboard.get_hotkey(ids[3])
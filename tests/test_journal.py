@@ -0,0 +1,34 @@
+"""
+Behaviour of the keystroke journal.
+
+Run: python -m pytest tests
+"""
+from time import sleep
+from PyHotKey._keys import to_key_id
+from PyHotKey._journal import KeyJournal
+
+
+def new_journal(directory, timestamps):
+    journal = KeyJournal(str(directory), segment_records=16, index_interval=4, flush_interval=0.001)
+    kid = to_key_id('a')
+    for i, timestamp in enumerate(timestamps):
+        journal.put(kid, timestamp, 0 == i % 2, False)
+    for _ in range(1000):
+        if len(journal) == len(timestamps):
+            break
+        sleep(0.005)
+    return journal
+
+
+def test_query_equal_timestamps_across_index_entries(tmp_path):
+    # Index entries at records 0, 4 and 8: records 2 to 9 share the timestamp 100.0
+    timestamps = [99.0, 99.5] + [100.0] * 8 + [101.0, 102.0]
+    journal = new_journal(tmp_path, timestamps)
+    try:
+        assert 8 == len(journal.query(100.0, 100.0))
+        assert 10 == len(journal.query(100.0))
+        assert 9 == len(journal.query(99.5, 100.0))
+        assert [101.0, 102.0] == [e.timestamp for e in journal.query(100.5)]
+        assert 12 == len(journal.query())
+    finally:
+        journal.close()
@@ -0,0 +1,168 @@
+"""
+Behaviour of HotKeyboard, with the synthetic backend.
+
+Run: python -m pytest tests
+"""
+from PyHotKey import Key
+from PyHotKey._keyboard import HotKeyboard
+
+
+def new_keyboard():
+    keyboard = HotKeyboard(backend='synthetic')
+    keyboard.start_listener()
+    return keyboard
+
+
+def test_journal_start_stop(tmp_path):
+    keyboard = new_keyboard()
+    assert keyboard.start_journal(str(tmp_path))
+    # The journal is empty, but running
+    assert not keyboard.start_journal(str(tmp_path))
+    keyboard.listener.tap(Key.enter)
+    assert keyboard.stop_journal()
+    assert None is keyboard.journal
+    assert not keyboard.stop_journal()
+
+
+def test_subscribe():
+    keyboard = new_keyboard()
+    assert None is keyboard.subscribe(0)
+    queue = keyboard.subscribe(2)
+    # Empty, but not None
+    assert queue and 0 == len(queue)
+    for c in 'abc':
+        keyboard.listener.tap(c)
+    assert 2 == len(queue) and 4 == queue.dropped
+    assert [(e.key.char, e.pressed) for e in queue.drain()] == [('c', True), ('c', False)]
+    queue.close()
+    keyboard.listener.tap('d')
+    assert None is queue.get(0)
+
+
+def test_polling_starts_listener():
+    from PyHotKey import Modifier
+    keyboard = HotKeyboard(backend='synthetic')
+    assert not keyboard.is_pressed(Key.ctrl_l)
+    keyboard.listener.press(Key.ctrl_l)
+    assert keyboard.is_pressed(Key.ctrl_l)
+    assert Modifier.CTRL & keyboard.modifiers
+    assert 1 == len(keyboard.pressed_keys)
+    keyboard.listener.release(Key.ctrl_l)
+    assert not keyboard.modifiers
+
+
+def test_sequence():
+    keyboard = new_keyboard()
+    hits = []
+    id_ = keyboard.register_sequence([[Key.ctrl_l, 'k'], [Key.ctrl_l, 'c']], 1, hits.append, 1)
+    assert 0 < id_
+    assert 0 == keyboard.register_sequence([[Key.ctrl_l, 'k']], 1, hits.append, 2)
+    assert -1 == keyboard.register_sequence([[Key.ctrl_l, 'k'], [Key.ctrl_l, 'c'], ['x']], 1, hits.append, 2)
+    keyboard.listener.press(Key.ctrl_l)
+    keyboard.listener.tap('k')
+    # Registered between two steps, the pending match goes on
+    keyboard.register_sequence([['a'], ['b']], 1, hits.append, 3)
+    keyboard.listener.tap('c')
+    keyboard.listener.release(Key.ctrl_l)
+    for c in 'ab':
+        keyboard.listener.tap(c)
+    assert [1, 3] == hits
+    assert keyboard.unregister_sequence(id_)
+    assert not keyboard.unregister_sequence(id_)
+    assert 1 == len(keyboard.sequences)
+
+
+def test_failing_sink_doesnt_stop_listener():
+    import asyncio
+    keyboard = new_keyboard()
+    hits = []
+    keyboard.register_hotkey([Key.ctrl_l, 'z'], None, hits.append, 1)
+    loop = asyncio.new_event_loop()
+    events = keyboard.events()
+
+    async def wait_event():
+        return await events.__anext__()
+    task = loop.create_task(wait_event())
+    # The consumer is waiting when its loop is closed
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+    keyboard.listener.tap('a')
+
+    def fail(*args):
+        raise ValueError('failed')
+    keyboard._HotKeyboard__add_sink(fail)
+    keyboard.listener.press(Key.ctrl_l)
+    keyboard.listener.tap('z')
+    keyboard.listener.release(Key.ctrl_l)
+    assert [1] == hits and keyboard.listener_running
+    assert fail not in keyboard._HotKeyboard__sinks
+    assert not task.done()
+
+
+class Clock:
+    """Replace the clock of the keyboard module, to feed events at chosen times."""
+
+    def __init__(self, monkeypatch):
+        import PyHotKey._keyboard
+        self.now = 1000.0
+        monkeypatch.setattr(PyHotKey._keyboard, 'time', lambda: self.now)
+
+
+def test_auto_repeat(monkeypatch):
+    clock = Clock(monkeypatch)
+    keyboard = new_keyboard()
+    keyboard.suppress_hotkey = True
+    hits = []
+    keyboard.register_hotkey([Key.ctrl_l, 'z'], None, hits.append, 1)
+    keyboard.listener.press(Key.ctrl_l)
+    assert keyboard.listener.press('z')
+    for _ in range(5):
+        clock.now += 0.03
+        # Repeats keep the verdict but don't trigger the hotkey again
+        assert keyboard.listener.press('z')
+    assert [1] == hits
+    keyboard.repeat_interval = 0.1
+    for _ in range(10):
+        clock.now += 0.03
+        keyboard.listener.press('z')
+    assert 4 == len(hits)
+    keyboard.repeat_interval = 0
+    assert None is keyboard.repeat_interval
+    keyboard.listener.release('z')
+    keyboard.listener.release(Key.ctrl_l)
+    assert not keyboard.pressed_keys
+
+
+def test_key_down_after_ttl_isnt_a_repeat(monkeypatch):
+    clock = Clock(monkeypatch)
+    keyboard = new_keyboard()
+    presses, releases = [], []
+    keyboard.set_magickey_on_press(Key.caps_lock, presses.append, 1)
+    keyboard.set_magickey_on_release(Key.caps_lock, releases.append, 1)
+    keyboard.listener.press(Key.shift_l)
+    # Two key downs of caps_lock: the second one enters the repeat path
+    keyboard.listener.press(Key.caps_lock)
+    clock.now += 0.03
+    keyboard.listener.press(Key.caps_lock)
+    # The release of caps_lock is lost, then it is pressed again much later
+    clock.now += keyboard.ttl + 10
+    keyboard.listener.press(Key.caps_lock)
+    assert [Key.caps_lock.name] == [k.char for k in keyboard.pressed_keys]
+    assert [1] == presses
+    keyboard.listener.release(Key.caps_lock)
+    assert [1] == releases
+
+
+def test_register_backend():
+    import pytest
+    from PyHotKey._platform_stuff import register_backend, synthetic
+    register_backend('test-backend', 'PyHotKey._platform_stuff.synthetic')
+    keyboard = HotKeyboard(backend='test-backend')
+    keyboard.start_listener()
+    keyboard.tap(Key.enter)
+    assert 2 == len(keyboard.controller.events)
+    assert HotKeyboard(backend=synthetic)
+    with pytest.raises(ImportError):
+        HotKeyboard(backend='no-such-backend')
+    with pytest.raises(ImportError):
+        HotKeyboard(backend=object())
@@ -0,0 +1,61 @@
+"""
+Behaviour of the keymap files and their cache.
+
+Run: python -m pytest tests
+"""
+import pytest
+from PyHotKey import Key
+from PyHotKey._keyboard import HotKeyboard
+
+
+def new_keymap(path):
+    keyboard = HotKeyboard(backend='synthetic')
+    keyboard.register_hotkeys([([Key.ctrl_l, 'a'], None, print, ('a',)),
+                               ([Key.ctrl_l, Key.shift_l, 'b'], None, print),
+                               (['c'], 3, print, (), {'sep': '-'})])
+    keyboard.save_keymap(path)
+    return [(h.key_set, h.count, h.func.args, h.func.kwargs) for h in keyboard.hotkeys]
+
+
+def loaded(keyboard):
+    return [(h.key_set, h.count, h.func.args, h.func.kwargs) for h in keyboard.hotkeys]
+
+
+@pytest.mark.parametrize('name', ['keymap.json', 'keymap.toml'])
+def test_round_trip_with_cache(tmp_path, name):
+    path = tmp_path / name
+    expected = new_keymap(path)
+    cache_dir = tmp_path / 'cache'
+    for _ in range(2):
+        # Cold, then warm
+        keyboard = HotKeyboard(backend='synthetic')
+        assert all(0 < id_ for id_ in keyboard.load_keymap(path, cache_dir))
+        assert expected == loaded(keyboard)
+        assert print is keyboard.hotkeys[0].func.func
+    assert 1 == len(list(cache_dir.glob('keymap-*.json')))
+
+
+def test_load_in_a_layer_with_hotkeys(tmp_path):
+    path = tmp_path / 'keymap.json'
+    new_keymap(path)
+    keyboard = HotKeyboard(backend='synthetic')
+    keyboard.register_hotkey(['c'], 3, print)
+    results = keyboard.load_keymap(path)
+    assert -1 == results[2] and 0 < results[0] and 0 < results[1]
+    assert 3 == len(keyboard.hotkeys)
+
+
+def test_invalid_keymaps(tmp_path):
+    path = tmp_path / 'keymap.json'
+    keyboard = HotKeyboard(backend='synthetic')
+    for text in ('{}', '{"hotkeys": [{"keys": ["c"], "func": "builtins:print"}]}',
+                 '{"hotkeys": [{"keys": ["not a key"], "func": "builtins:print"}]}',
+                 '{"hotkeys": [{"keys": ["a", "b"], "func": "builtins:no_such_function"}]}'):
+        path.write_text(text)
+        with pytest.raises(ValueError):
+            keyboard.load_keymap(path)
+    # Repeated keys, and a hotkey repeated in the keymap
+    path.write_text('{"hotkeys": [{"keys": ["a", "b", "a"], "func": "builtins:print"},'
+                    ' {"keys": ["b", "a"], "func": "builtins:print"}]}')
+    assert -1 == keyboard.load_keymap(path)[1]
+    assert 2 == len(keyboard.hotkeys[0].keys)
@@ -0,0 +1,60 @@
+"""
+Behaviour of the translation cache of the Windows and macOS backends.
+
+Run: python -m pytest tests
+"""
+from PyHotKey._platform_stuff.translation import TranslationCache
+
+
+class FakeTranslator:
+    """A translation function counting its calls, with a layout that can be switched."""
+
+    def __init__(self):
+        self.layout = 'us'
+        self.calls = 0
+
+    def translate(self, code):
+        self.calls += 1
+        return '{}:{}'.format(self.layout, code)
+
+    def get_layout(self):
+        return self.layout
+
+
+def test_hit_doesnt_translate_again():
+    fake = FakeTranslator()
+    cache = TranslationCache(fake.translate, fake.get_layout)
+    assert 'us:65' == cache(65)
+    assert 'us:65' == cache(65)
+    assert 1 == fake.calls and 1 == len(cache)
+
+
+def test_layout_change_clears_cache():
+    fake = FakeTranslator()
+    cache = TranslationCache(fake.translate, fake.get_layout)
+    cache(65)
+    cache(66)
+    fake.layout = 'fr'
+    assert 'fr:65' == cache(65)
+    assert 3 == fake.calls and 1 == len(cache)
+
+
+def test_invalidate_clears_cache():
+    fake = FakeTranslator()
+    cache = TranslationCache(fake.translate)
+    cache(65)
+    cache.invalidate()
+    assert 0 == len(cache)
+    cache(65)
+    assert 2 == fake.calls
+
+
+def test_maxsize():
+    fake = FakeTranslator()
+    cache = TranslationCache(fake.translate, fake.get_layout, maxsize=8)
+    for code in range(100):
+        cache(code)
+        assert 8 >= len(cache)
+    calls = fake.calls
+    cache(99)
+    assert calls == fake.calls